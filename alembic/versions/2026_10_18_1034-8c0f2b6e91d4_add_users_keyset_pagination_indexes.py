@@ -0,0 +1,31 @@
+"""Add keyset pagination indexes to 'users' table
+
+Revision ID: 8c0f2b6e91d4
+Revises: 371edd790b1d
+Create Date: 2026-10-18 10:34:12.604981
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c0f2b6e91d4'
+down_revision: Union[str, None] = '371edd790b1d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Built concurrently so that large tables stay writable during the migration
+    with op.get_context().autocommit_block():
+        op.create_index('ix_users_username_id', 'users', ['username', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_users_email_id', 'users', ['email', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_email_id', table_name='users', postgresql_concurrently=True)
+        op.drop_index('ix_users_username_id', table_name='users', postgresql_concurrently=True)
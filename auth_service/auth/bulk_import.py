@@ -0,0 +1,131 @@
+import csv
+import json
+import uuid
+from typing import Any, AsyncIterator
+from pydantic import ValidationError
+
+from auth_service.auth.config import auth_settings
+from auth_service.auth.hashing import PasswordHasher, bulk_password_hasher
+from auth_service.auth.repository import UserRepository
+from auth_service.auth.scemas import UserCreate, UserImportReport, UserImportRowResult
+
+
+IMPORT_FORMATS: tuple[str, ...] = ("ndjson", "csv")
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a stream of byte chunks into decoded lines."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8").rstrip("\r")
+
+    if buffer:
+        yield buffer.decode("utf-8").rstrip("\r")
+
+
+async def iter_records(lines: AsyncIterator[str], import_format: str) -> AsyncIterator[tuple[int, Any]]:
+    """Yield (row number, raw record) pairs from NDJSON or CSV lines.
+
+    CSV input must start with a header; quoted fields cannot span lines.
+    """
+    header: list[str] | None = None
+    row = 0
+
+    async for line in lines:
+        if not line.strip():
+            continue
+
+        if import_format == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = values
+                continue
+            record: Any = dict(zip(header, values))
+        else:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = line
+
+        row += 1
+        yield row, record
+
+
+class UserImporter:
+    """Imports users in batches: passwords of a batch are hashed in parallel and
+    the batch is inserted with a single `INSERT ... ON CONFLICT DO NOTHING`.
+    """
+
+    def __init__(
+        self,
+        repository: UserRepository,
+        hasher: PasswordHasher = bulk_password_hasher,
+        batch_size: int = auth_settings.bulk_import_batch_size,
+    ) -> None:
+        self.repository = repository
+        self.hasher = hasher
+        self.batch_size = batch_size
+
+    async def import_users(self, lines: AsyncIterator[str], import_format: str = "ndjson") -> UserImportReport:
+        report = UserImportReport()
+        batch: list[tuple[int, UserCreate]] = []
+
+        async for row, record in iter_records(lines, import_format):
+            try:
+                batch.append((row, UserCreate.model_validate(record)))
+            except ValidationError as exc:
+                report.invalid += 1
+                report.rows.append(
+                    UserImportRowResult(
+                        row=row,
+                        username=record.get("username") if isinstance(record, dict) else None,
+                        status="invalid",
+                        detail="; ".join(
+                            ": ".join(filter(None, (".".join(map(str, error["loc"])), error["msg"])))
+                            for error in exc.errors()
+                        ),
+                    )
+                )
+                continue
+
+            if len(batch) >= self.batch_size:
+                await self._import_batch(batch, report)
+                batch = []
+
+        await self._import_batch(batch, report)
+        return report
+
+    async def _import_batch(self, batch: list[tuple[int, UserCreate]], report: UserImportReport) -> None:
+        if not batch:
+            return
+
+        hashed_passwords = await self.hasher.hash_many([user.password for _, user in batch])
+        data = [
+            {
+                "id": uuid.uuid4(),
+                "username": user.username,
+                "email": user.email,
+                "hashed_password": hashed_password,
+                "is_active": True,
+                "is_admin": False,
+                "token_version": 0,
+            }
+            for (_, user), hashed_password in zip(batch, hashed_passwords)
+        ]
+        created_ids = await self.repository.create_many(data)
+
+        report.created += len(created_ids)
+        for (row, user), user_data in zip(batch, data):
+            if user_data["id"] not in created_ids:
+                report.conflicts += 1
+                report.rows.append(
+                    UserImportRowResult(
+                        row=row,
+                        username=user.username,
+                        status="conflict",
+                        detail="Username or email already exists",
+                    )
+                )
@@ -0,0 +1,132 @@
+import binascii
+import json
+import time
+from typing import Any
+import jwt
+from jwt.algorithms import Algorithm, get_default_algorithms
+from jwt.exceptions import (
+    DecodeError,
+    ExpiredSignatureError,
+    ImmatureSignatureError,
+    InvalidIssuedAtError,
+    InvalidSignatureError,
+    InvalidTokenError,
+    MissingRequiredClaimError,
+)
+from jwt.utils import base64url_decode, base64url_encode
+
+from auth_service.auth.keys import KeyManager, key_manager
+
+
+class TokenCodec:
+    """Signs and verifies tokens with the parsed keys of a `KeyManager`.
+
+    Tokens carrying the exact header this service writes are handled without
+    PyJWT's per-call header parsing, key preparation and option merging: the
+    header segment is looked up among the keys' prebuilt ones and the signature
+    is checked directly. Any other token goes through a reused `PyJWT` instance.
+    """
+
+    def __init__(self, keys: KeyManager = key_manager, leeway: float = 0) -> None:
+        self.keys = keys
+        self.leeway = leeway
+        # Time claims are checked by `_validate_claims` on both paths
+        self._jwt = jwt.PyJWT(
+            options={"require": ["exp"], "verify_exp": False, "verify_iat": False, "verify_nbf": False}
+        )
+        self._algorithms: dict[str, Algorithm] = get_default_algorithms()  # type: ignore
+
+    def encode(self, payload: dict[str, Any]) -> str:
+        """Sign a payload whose values are JSON serializable, with numeric `iat`/`exp`."""
+        key = self.keys.get_signing_key()
+        signing_input = key.header_segment + b"." + base64url_encode(
+            json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        )
+        signature = self._algorithms[key.algorithm].sign(signing_input, key.private_key)
+        return (signing_input + b"." + base64url_encode(signature)).decode("ascii")
+
+    def decode(self, token: str) -> dict[str, Any]:
+        self.keys.reload_if_changed()
+        return self._decode(token)
+
+    def decode_many(self, tokens: list[str]) -> list[dict[str, Any] | None]:
+        """Verify many tokens at once; invalid tokens give `None` in their position."""
+        self.keys.reload_if_changed()
+
+        payloads: list[dict[str, Any] | None] = []
+        for token in tokens:
+            try:
+                payloads.append(self._decode(token))
+            except InvalidTokenError:
+                payloads.append(None)
+        return payloads
+
+    def _decode(self, token: str) -> dict[str, Any]:
+        try:
+            signing_input, separator, signature_segment = token.encode("ascii").rpartition(b".")
+            header_segment, payload_separator, payload_segment = signing_input.partition(b".")
+        except UnicodeEncodeError as exc:
+            raise DecodeError("Invalid token encoding") from exc
+        if not separator or not payload_separator:
+            raise DecodeError("Not enough segments")
+
+        key = self.keys.keys_by_header.get(header_segment)
+        if key is None:
+            return self._decode_generic(token)
+
+        try:
+            signature = base64url_decode(signature_segment)
+            raw_payload = base64url_decode(payload_segment)
+        except (binascii.Error, ValueError) as exc:
+            raise DecodeError("Invalid token padding") from exc
+
+        if not self._algorithms[key.algorithm].verify(signing_input, key.public_key, signature):
+            raise InvalidSignatureError("Signature verification failed")
+
+        try:
+            payload = json.loads(raw_payload)
+        except ValueError as exc:
+            raise DecodeError(f"Invalid payload string: {exc}") from exc
+        if not isinstance(payload, dict):
+            raise DecodeError("Invalid payload string: must be a json object")
+
+        self._validate_claims(payload)
+        return payload
+
+    def _decode_generic(self, token: str) -> dict[str, Any]:
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self.keys.get_verification_key(kid)
+        if key is None:
+            raise InvalidTokenError(f"Unknown signing key {kid!r}")
+        payload = self._jwt.decode(token, key.public_key, algorithms=[key.algorithm])
+        self._validate_claims(payload)
+        return payload
+
+    @staticmethod
+    def _get_time_claim(payload: dict[str, Any], claim: str) -> int:
+        value = payload.get(claim, 0)
+        error = InvalidIssuedAtError if claim == "iat" else DecodeError
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise error(f"The {claim} claim must be a number")
+        try:
+            return int(value)
+        except (OverflowError, ValueError) as exc:
+            raise error(f"The {claim} claim must be a finite number") from exc
+
+    def _validate_claims(self, payload: dict[str, Any]) -> None:
+        # The same checks as PyJWT with `require=["exp"]`, except that time claims must be JSON numbers
+        if "exp" not in payload:
+            raise MissingRequiredClaimError("exp")
+
+        now = time.time()
+        exp, iat, nbf = (self._get_time_claim(payload, claim) for claim in ("exp", "iat", "nbf"))
+
+        if exp <= now - self.leeway:
+            raise ExpiredSignatureError("Signature has expired")
+        if iat > now + self.leeway:
+            raise ImmatureSignatureError("The token is not yet valid (iat)")
+        if nbf > now + self.leeway:
+            raise ImmatureSignatureError("The token is not yet valid (nbf)")
+
+
+token_codec = TokenCodec()
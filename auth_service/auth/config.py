@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 from pydantic_settings import BaseSettings
 
 
@@ -8,9 +9,101 @@ BASE_DIR = Path(__file__).parent.parent.parent
 class AuthSettings(BaseSettings):
     private_key_path: Path = BASE_DIR / "certs" / "private.pem"
     public_key_path: Path = BASE_DIR / "certs" / "public.pem"
-    algorithm: str = "RS256"
+    # Algorithm for RSA keys; EC keys use ES256/ES384/ES512 by curve and Ed25519 keys EdDSA
+    algorithm: Literal["RS256", "RS384", "RS512", "PS256", "PS384", "PS512"] = "RS256"
+    # Directory of <kid>.private.pem / <kid>.public.pem files, used instead of the key pair above
+    signing_keys_dir: Path | None = None
+    # Key to sign with; defaults to the most recently written private key
+    signing_key_id: str | None = None
+    key_reload_interval_seconds: float = 10.0
+    jwks_max_age_seconds: int = 300
     access_token_expire_minutes: int = 15
     refresh_token_expire_minutes: int = 60 * 24 * 30
 
+    # New passwords are hashed with this scheme and cost. Stored hashes with another
+    # scheme or a lower cost are upgraded in the background after a successful login.
+    password_hash_scheme: Literal["argon2id", "bcrypt"] = "bcrypt"
+    password_hash_bcrypt_rounds: int = 12
+    password_hash_argon2_time_cost: int = 3
+    password_hash_argon2_memory_cost: int = 64 * 1024
+    password_hash_argon2_parallelism: int = 4
+    password_rehash_on_login: bool = True
+    # If set, the cost is raised at startup until hashing takes about this long on the host
+    password_hash_target_ms: float | None = None
+
+    # Login attempts are limited per client IP and per username before any hashing,
+    # and usernames are blocked for exponentially growing delays after repeated failures
+    login_rate_limit_enabled: bool = True
+    login_rate_limit_ip_capacity: int = 30
+    login_rate_limit_ip_refill_per_second: float = 1.0
+    login_rate_limit_username_capacity: int = 10
+    login_rate_limit_username_refill_per_second: float = 0.2
+    login_rate_limit_trust_forwarded_for: bool = False
+    login_backoff_threshold: int = 5
+    login_backoff_base_seconds: float = 1.0
+    login_backoff_max_seconds: float = 15 * 60
+
+    # Password hashing runs in a worker pool so that bcrypt does not block the event loop
+    password_hasher_executor: Literal["thread", "process"] = "thread"
+    password_hasher_max_workers: int | None = None
+    password_hasher_max_pending: int = 64
+
+    # Verified access tokens are cached per worker until they expire
+    token_cache_enabled: bool = True
+    token_cache_max_entries: int = 10_000
+    token_cache_max_bytes: int = 16 * 1024 * 1024
+
+    # Build the current user from access token claims instead of loading the users row.
+    # The user's is_active and token_version are still checked, through the user cache if it is enabled.
+    stateless_auth_enabled: bool = False
+    stateless_auth_revocation_check: bool = True
+
+    # User profiles and token state are cached in-process and, if REDIS_URL is set, in Redis.
+    # Other workers see an update once their local entry expires, and fills of a user
+    # are skipped for the guard period after it is invalidated.
+    user_cache_enabled: bool = True
+    user_cache_max_entries: int = 10_000
+    user_cache_ttl_seconds: float = 60.0
+    user_cache_local_ttl_seconds: float = 5.0
+    user_cache_fill_guard_seconds: float = 5.0
+
+    # Most tokens accepted by one POST /auth/introspect request
+    token_introspection_max_tokens: int = 1000
+
+    # Most ids or usernames accepted by one POST /users/lookup request, and per query
+    user_lookup_max_values: int = 5000
+    user_lookup_chunk_size: int = 1000
+
+    # Largest page returned by GET /users/
+    user_listing_max_limit: int = 1000
+
+    # Concurrent lookups of the same user share one query, and lookups arriving together,
+    # or within the window while other lookups are running, are merged into one IN query per field
+    user_loader_enabled: bool = True
+    user_loader_window_seconds: float = 0.002
+
+    # Signs pagination cursors; must be shared by all workers, which otherwise each use a random one
+    cursor_secret: str | None = None
+
+    # Rows fetched from the server-side cursor per chunk of a users export
+    export_chunk_size: int = 1000
+
+    # Bulk imports hash each batch in parallel, then insert it in one statement
+    bulk_import_batch_size: int = 1000
+    bulk_import_hasher_executor: Literal["thread", "process"] = "process"
+    bulk_import_hasher_max_workers: int | None = None
+
+    # Issued refresh tokens are tracked to rotate them and detect reuse
+    refresh_token_store: Literal["database", "memory"] = "database"
+    refresh_token_cleanup_interval_seconds: float = 60 * 60
+    refresh_token_cleanup_batch_size: int = 1000
+
+    # Revoked access tokens are replayed from the token_revocations table into each worker,
+    # every TOKEN_REVOCATION_SYNC_INTERVAL_SECONDS: a revocation made on one worker reaches the others within it
+    token_revocation_enabled: bool = True
+    token_revocation_sync_interval_seconds: float = 1.0
+    token_revocation_sync_overlap_seconds: float = 5.0
+    token_revocation_purge_interval_seconds: float = 60 * 60
+
 
 auth_settings = AuthSettings()
@@ -1,14 +1,35 @@
+import math
 from typing import Any, Callable, Coroutine
-from fastapi import Depends, Form, HTTPException, status
+from uuid import UUID
+from fastapi import Depends, Form, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jwt.exceptions import InvalidTokenError
 
-from auth_service.database import get_async_session
+from auth_service.database import async_session_maker, get_async_session
+from auth_service.jobs import job_queue
 from auth_service.auth.service import UserService
 from auth_service.auth.repository import UserRepository
-from auth_service.auth.scemas import UserGet, UserGetWithPassword
-from auth_service.auth.utils import decode_jwt, validate_password, ACCESS_TOKEN_TYPE, REFRESH_TOKEN_TYPE
-from auth_service.auth.exceptions import UserNotFound
+from auth_service.auth.user_cache import CachedUserRepository, user_cache
+from auth_service.auth.loader import user_loader
+from auth_service.auth.config import auth_settings
+from auth_service.auth.scemas import UserGet, UserGetWithPassword, UserGetWithVersion, RefreshTokenRecord
+from auth_service.auth.utils import ACCESS_TOKEN_TYPE, REFRESH_TOKEN_TYPE, TOKEN_VERSION_FIELD, decode_jwt
+from auth_service.auth.token_cache import decode_jwt_cached
+from auth_service.auth.hashing import password_hasher, validate_password_async
+from auth_service.auth.exceptions import (
+    UserNotFound,
+    PasswordHasherOverloaded,
+    InvalidRefreshToken,
+    RefreshTokenReused,
+    RateLimitExceeded,
+)
+from auth_service.auth.rate_limit import get_client_ip, login_rate_limiter
+from auth_service.auth.revocation import TokenRevoker, revocation_list
+from auth_service.auth.refresh_tokens import (
+    RefreshTokenStore,
+    get_refresh_token_store_for_session,
+    rotate_refresh_token,
+)
 
 
 http_bearer = HTTPBearer()
@@ -17,30 +38,111 @@ http_bearer = HTTPBearer()
 async def get_user_service(
     async_session=Depends(get_async_session),
 ) -> UserService:
-    repository = UserRepository(async_session)
+    loader = user_loader if auth_settings.user_loader_enabled else None
+    if auth_settings.user_cache_enabled:
+        repository = CachedUserRepository(async_session, user_cache, loader)
+    else:
+        repository = UserRepository(async_session, loader)
     return UserService(repository)
 
 
+async def get_token_revoker(
+    async_session=Depends(get_async_session),
+) -> TokenRevoker:
+    return TokenRevoker(async_session)
+
+
+async def get_refresh_token_store(
+    async_session=Depends(get_async_session),
+) -> RefreshTokenStore:
+    return get_refresh_token_store_for_session(async_session)
+
+
+REHASH_PASSWORD_JOB = "rehash_password"
+
+
+async def _rehash_passwords(payloads: list[dict[str, Any]]) -> None:
+    errors = []
+    async with async_session_maker() as async_session:
+        user_service = await get_user_service(async_session)
+        for payload in payloads:
+            try:
+                await user_service.rehash_password(
+                    UUID(payload["user_id"]),
+                    payload["password"],
+                    payload["hashed_password"],
+                )
+            except PasswordHasherOverloaded:
+                # The hash is upgraded on a later login instead
+                pass
+            except Exception as exc:
+                errors.append(exc)
+                await async_session.rollback()
+
+    # Raised so that the queue retries the batch; hashes upgraded by the first attempt are not replaced again
+    if errors:
+        raise ExceptionGroup("Failed to rehash passwords", errors)
+
+
+job_queue.register(REHASH_PASSWORD_JOB, _rehash_passwords)
+
+
 async def authenticate_user(
+    request: Request,
     username: str = Form(...),
     password: str = Form(...),
     user_service: UserService = Depends(get_user_service),
 ) -> UserGetWithPassword:
+    if auth_settings.login_rate_limit_enabled:
+        try:
+            await login_rate_limiter.check(get_client_ip(request), username)
+        except RateLimitExceeded as exc:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts, try again later",
+                headers={"Retry-After": str(math.ceil(exc.retry_after))},
+            ) from exc
+
     try:
-        user: UserGetWithPassword = await user_service.get_user(  # type: ignore
+        user: UserGetWithPassword | None = await user_service.get_user(  # type: ignore
             include_password=True,
             username=username,
         )
-    except UserNotFound as exc:
+    except UserNotFound:
+        user = None
+
+    try:
+        if user is None:
+            await password_hasher.verify_dummy(password)
+            is_valid_password = False
+        else:
+            is_valid_password = await validate_password_async(password, user.hashed_password)
+    except PasswordHasherOverloaded as exc:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts in progress, try again later",
+            headers={"Retry-After": "1"},
         ) from exc
 
-    if not validate_password(password, user.hashed_password):
+    if user is None or not is_valid_password:
+        if auth_settings.login_rate_limit_enabled:
+            await login_rate_limiter.record_failure(username)
+        # The same answer for unknown usernames and wrong passwords, so that usernames cannot be probed
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect password",
+            detail="Incorrect username or password",
+        )
+
+    if auth_settings.login_rate_limit_enabled:
+        await login_rate_limiter.record_success(username)
+
+    if auth_settings.password_rehash_on_login and password_hasher.needs_rehash(user.hashed_password):
+        # Kept out of the durable job store, since the job holds the plaintext password
+        job_queue.enqueue(
+            REHASH_PASSWORD_JOB,
+            {"user_id": str(user.id), "password": password, "hashed_password": user.hashed_password},
+            key=str(user.id),
+            durable=False,
         )
 
     if not user.is_active:
@@ -52,12 +154,9 @@ async def authenticate_user(
     return user
 
 
-async def _get_token_payload(
-    credentials: HTTPAuthorizationCredentials = Depends(http_bearer),
-) -> dict[str, Any]:
-    token = credentials.credentials
+def _decode_token(token: str, decode: Callable[[str], dict[str, Any]]) -> dict[str, Any]:
     try:
-        return decode_jwt(token)
+        return decode(token)
     except InvalidTokenError as exc:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -65,13 +164,42 @@ async def _get_token_payload(
         ) from exc
 
 
+async def _get_token_payload(
+    credentials: HTTPAuthorizationCredentials = Depends(http_bearer),
+) -> dict[str, Any]:
+    return _decode_token(credentials.credentials, decode_jwt_cached)
+
+
+async def _get_refresh_token_payload(
+    credentials: HTTPAuthorizationCredentials = Depends(http_bearer),
+) -> dict[str, Any]:
+    # Refresh tokens are used once, so they are not looked up in the token cache
+    return _decode_token(credentials.credentials, decode_jwt)
+
+
+def _get_user_from_claims(token_payload: dict[str, Any]) -> UserGetWithVersion | None:
+    try:
+        # Claims were signed by this service, so they are not validated again
+        return UserGetWithVersion.model_construct(
+            id=UUID(token_payload["sub"]),
+            username=token_payload["username"],
+            email=token_payload["email"],
+            is_active=token_payload["is_active"],
+            token_version=token_payload[TOKEN_VERSION_FIELD],
+        )
+    except (KeyError, ValueError, TypeError):
+        # Tokens issued before these claims were added
+        return None
+
+
 def get_current_user_by_token_type(
-    token_type: str
-) -> Callable[..., Coroutine[Any, Any, UserGet]]:
+    token_type: str,
+    stateless: bool = False,
+) -> Callable[..., Coroutine[Any, Any, UserGetWithVersion]]:
     async def get_current_user_by_token_type_wrapper(
         user_service: UserService = Depends(get_user_service),
         token_payload: dict[str, Any] = Depends(_get_token_payload),
-    ) -> UserGet:
+    ) -> UserGetWithVersion:
         given_token_type = token_payload.get("type")
         if given_token_type != token_type:
             raise HTTPException(
@@ -79,21 +207,89 @@ def get_current_user_by_token_type(
                 detail=f"Invalid token type {given_token_type!r}, expected {token_type!r}",
             )
 
+        if auth_settings.token_revocation_enabled and revocation_list.is_revoked(token_payload):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Invalid authorization token",
+            )
+
+        if stateless and (user := _get_user_from_claims(token_payload)) is not None:
+            # The revocation list only knows about logouts and deletions, so a deactivated
+            # user is still caught by checking the user's state
+            if (
+                auth_settings.stateless_auth_revocation_check
+                and not await user_service.is_token_version_current(
+                    id=user.id,
+                    token_version=user.token_version,
+                )
+            ):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Invalid authorization token",
+                )
+            return user
+
         try:
-            user = await user_service.get_user(id=token_payload.get("sub"))
-        except UserNotFound as exc:
+            user = await user_service.get_user(  # type: ignore
+                include_version=True,
+                id=UUID(token_payload.get("sub")),
+            )
+        except (UserNotFound, TypeError, ValueError) as exc:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Invalid authorization token",
             ) from exc
 
+        token_version = token_payload.get(TOKEN_VERSION_FIELD)
+        if token_version is not None and token_version != user.token_version:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Invalid authorization token",
+            )
+
         return user
 
     return get_current_user_by_token_type_wrapper
 
 
-get_current_user = get_current_user_by_token_type(ACCESS_TOKEN_TYPE)
-get_current_user_for_refresh = get_current_user_by_token_type(REFRESH_TOKEN_TYPE)
+get_current_user = get_current_user_by_token_type(
+    ACCESS_TOKEN_TYPE,
+    stateless=auth_settings.stateless_auth_enabled,
+)
+
+
+async def get_current_token_payload(
+    token_payload: dict[str, Any] = Depends(_get_token_payload),
+    user: UserGet = Depends(get_current_user),
+) -> dict[str, Any]:
+    """Get the payload of the current user's access token."""
+    return token_payload
+
+
+async def get_refresh_token_record(
+    token_payload: dict[str, Any] = Depends(_get_refresh_token_payload),
+    store: RefreshTokenStore = Depends(get_refresh_token_store),
+) -> RefreshTokenRecord:
+    """Validate a refresh token against the store and consume it for rotation."""
+    given_token_type = token_payload.get("type")
+    if given_token_type != REFRESH_TOKEN_TYPE:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Invalid token type {given_token_type!r}, expected {REFRESH_TOKEN_TYPE!r}",
+        )
+
+    try:
+        return await rotate_refresh_token(store, UUID(token_payload.get("jti")))
+    except RefreshTokenReused as exc:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token was already used, log in again",
+        ) from exc
+    except (InvalidRefreshToken, TypeError, ValueError) as exc:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+        ) from exc
 
 
 async def get_current_active_user(
@@ -106,3 +302,16 @@ async def get_current_active_user(
         )
 
     return user
+
+
+async def get_current_admin_user(
+    user: UserGet = Depends(get_current_active_user),
+    user_service: UserService = Depends(get_user_service),
+) -> UserGet:
+    if not await user_service.is_admin(id=user.id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required",
+        )
+
+    return user
@@ -1,2 +1,30 @@
 class UserNotFound(Exception):
     """User not found exception."""
+
+
+class PasswordHasherOverloaded(Exception):
+    """Too many password hashing operations are pending."""
+
+
+class InvalidCursor(Exception):
+    """Pagination cursor is malformed or was not issued by this service."""
+
+
+class InvalidSortOrder(Exception):
+    """Users cannot be sorted by the requested column."""
+
+
+class InvalidRefreshToken(Exception):
+    """Refresh token is unknown, expired or revoked."""
+
+
+class RefreshTokenReused(InvalidRefreshToken):
+    """Refresh token was already rotated; its whole family has been revoked."""
+
+
+class RateLimitExceeded(Exception):
+    """Too many attempts; the client should retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Retry after {retry_after:.1f} seconds")
+        self.retry_after = retry_after
@@ -0,0 +1,48 @@
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Sequence
+from sqlalchemy import Row
+
+from auth_service.database import async_session_maker
+from auth_service.auth.config import auth_settings
+from auth_service.auth.repository import UserRepository
+
+
+EXPORT_COLUMNS: tuple[str, ...] = ("id", "username", "email", "is_active")
+EXPORT_MEDIA_TYPES: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _encode_ndjson(rows: Sequence[Row[Any]]) -> str:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str, separators=(",", ":")) + "\n"
+        for row in rows
+    )
+
+
+def _encode_csv(rows: Sequence[Row[Any]]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+async def export_users(export_format: str = "ndjson") -> AsyncIterator[str]:
+    """Yield all users encoded as NDJSON or CSV, one chunk per fetched batch of rows.
+
+    The export runs in its own session, since request-scoped sessions are closed
+    before a streaming response is sent.
+    """
+    encode = _encode_csv if export_format == "csv" else _encode_ndjson
+    if export_format == "csv":
+        yield ",".join(EXPORT_COLUMNS) + "\r\n"
+
+    async with async_session_maker() as session:
+        repository = UserRepository(session)
+        async for rows in repository.stream_multiple(
+            columns=EXPORT_COLUMNS,
+            chunk_size=auth_settings.export_chunk_size,
+        ):
+            yield encode(rows)
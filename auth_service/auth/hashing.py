@@ -0,0 +1,106 @@
+import asyncio
+import secrets
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Sequence
+
+from auth_service.metrics import time_stage
+from auth_service.auth.config import auth_settings
+from auth_service.auth.exceptions import PasswordHasherOverloaded
+from auth_service.auth.password_policy import PasswordPolicy, password_policy
+
+
+class PasswordHasher:
+    """Runs password hashing in a bounded worker pool instead of on the event loop.
+
+    Once `max_pending` operations are queued or running, new calls fail fast
+    with `PasswordHasherOverloaded` instead of piling up behind the pool.
+    """
+
+    def __init__(
+        self,
+        executor_type: str = "thread",
+        max_workers: int | None = None,
+        max_pending: int = 64,
+        policy: PasswordPolicy = password_policy,
+    ) -> None:
+        self.policy = policy
+        self.executor_type = executor_type
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor: Executor | None = None
+        self._dummy_hash: str | None = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="password-hasher",
+                )
+        return self._executor
+
+    async def _run_many(self, func: Callable[..., Any], *args_list: Sequence[Any]) -> list[Any]:
+        if self.pending + len(args_list) > self.max_pending:
+            raise PasswordHasherOverloaded(f"{self.pending} password hashing operations are pending")
+
+        self.pending += len(args_list)
+        try:
+            loop = asyncio.get_running_loop()
+            return await asyncio.gather(*(loop.run_in_executor(self.executor, func, *args) for args in args_list))
+        finally:
+            self.pending -= len(args_list)
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        return (await self._run_many(func, args))[0]
+
+    async def hash(self, password: str) -> str:
+        with time_stage("password_hash"):
+            return await self._run(self.policy.hash, password)
+
+    async def hash_many(self, passwords: Sequence[str]) -> list[str]:
+        """Hash passwords in parallel across the pool's workers."""
+        return await self._run_many(self.policy.hash, *((password,) for password in passwords))
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        with time_stage("password_verify"):
+            return await self._run(self.policy.verify, password, hashed_password)
+
+    async def verify_dummy(self, password: str) -> None:
+        """Take as long as verifying a real password, so that unknown usernames do not answer faster."""
+        if self._dummy_hash is None or self.policy.needs_rehash(self._dummy_hash):
+            self._dummy_hash = await self.hash(secrets.token_urlsafe())
+        await self.verify(password, self._dummy_hash)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        return self.policy.needs_rehash(hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    executor_type=auth_settings.password_hasher_executor,
+    max_workers=auth_settings.password_hasher_max_workers,
+    max_pending=auth_settings.password_hasher_max_pending,
+)
+
+# Bulk imports get their own pool so that they cannot starve logins
+bulk_password_hasher = PasswordHasher(
+    executor_type=auth_settings.bulk_import_hasher_executor,
+    max_workers=auth_settings.bulk_import_hasher_max_workers,
+    max_pending=auth_settings.bulk_import_batch_size,
+)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.hash(password)
+
+
+async def validate_password_async(password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(password, hashed_password)
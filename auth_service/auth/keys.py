@@ -0,0 +1,211 @@
+import base64
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any
+from cryptography.hazmat.primitives.asymmetric import ec, ed448, ed25519, rsa
+from cryptography.hazmat.primitives.serialization import load_pem_private_key, load_pem_public_key
+from jwt.algorithms import get_default_algorithms
+from jwt.utils import base64url_encode
+
+from auth_service.auth.config import auth_settings
+
+
+logger = logging.getLogger(__name__)
+
+PRIVATE_KEY_SUFFIX: str = ".private.pem"
+PUBLIC_KEY_SUFFIX: str = ".public.pem"
+
+# Members of a JWK that make up its RFC 7638 thumbprint
+JWK_THUMBPRINT_MEMBERS: dict[str, tuple[str, ...]] = {
+    "RSA": ("e", "kty", "n"),
+    "EC": ("crv", "kty", "x", "y"),
+    "OKP": ("crv", "kty", "x"),
+}
+
+EC_CURVE_ALGORITHMS: dict[str, str] = {
+    "secp256r1": "ES256",
+    "secp384r1": "ES384",
+    "secp521r1": "ES512",
+}
+
+
+def get_key_algorithm(key: Any) -> str:
+    """Get the JWS algorithm a key signs with.
+
+    RSA keys use the configured RSA algorithm, EC keys the algorithm of their
+    curve and Ed25519/Ed448 keys EdDSA.
+    """
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return auth_settings.algorithm
+    if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)):
+        if key.curve.name not in EC_CURVE_ALGORITHMS:
+            raise ValueError(f"Unsupported elliptic curve {key.curve.name}")
+        return EC_CURVE_ALGORITHMS[key.curve.name]
+    if isinstance(
+        key,
+        (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey, ed448.Ed448PrivateKey, ed448.Ed448PublicKey),
+    ):
+        return "EdDSA"
+    raise ValueError(f"Unsupported key type {type(key).__name__}")
+
+
+def jwk_thumbprint(jwk: dict[str, Any]) -> str:
+    members = {member: jwk[member] for member in JWK_THUMBPRINT_MEMBERS[jwk["kty"]]}
+    digest = hashlib.sha256(json.dumps(members, separators=(",", ":"), sort_keys=True).encode("utf-8")).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+class SigningKey:
+    """Parsed key pair; keys that are being retired may have no private part."""
+
+    def __init__(
+        self,
+        algorithm: str,
+        public_key: Any,
+        private_key: Any | None = None,
+        private_pem: bytes | None = None,
+        kid: str | None = None,
+    ) -> None:
+        self.algorithm = algorithm
+        self.public_key = public_key
+        self.private_key = private_key
+        self.private_pem = private_pem
+        self.jwk: dict[str, Any] = get_default_algorithms()[algorithm].to_jwk(public_key, as_dict=True)  # type: ignore
+        self.kid = kid or jwk_thumbprint(self.jwk)
+        self.jwk.update(kid=self.kid, alg=algorithm, use="sig")
+        # Encoded JOSE header of every token signed with this key
+        self.header_segment = base64url_encode(
+            json.dumps({"alg": algorithm, "kid": self.kid, "typ": "JWT"}, separators=(",", ":")).encode("utf-8")
+        )
+
+    @classmethod
+    def from_pem(cls, pem: bytes, kid: str | None = None) -> "SigningKey":
+        try:
+            private_key = load_pem_private_key(pem, password=None)
+        except ValueError:
+            public_key = load_pem_public_key(pem)
+            return cls(get_key_algorithm(public_key), public_key=public_key, kid=kid)
+        return cls(
+            get_key_algorithm(private_key),
+            public_key=private_key.public_key(),
+            private_key=private_key,
+            private_pem=pem,
+            kid=kid,
+        )
+
+
+class KeyManager:
+    """Holds the active signing key and every key tokens may still be verified with.
+
+    Keys are read either from `signing_keys_dir`, where `<kid>.private.pem` files
+    can sign and `<kid>.public.pem` files only verify, or from the single legacy
+    key pair. Key files are polled for changes at most every `reload_interval`
+    seconds, so keys can be added, rotated and retired without a restart.
+
+    The algorithm is chosen per key from its type, so tokens signed with an RSA
+    key keep verifying while signing moves to an EC or Ed25519 key.
+    """
+
+    def __init__(
+        self,
+        keys_dir: Path | None = auth_settings.signing_keys_dir,
+        signing_kid: str | None = auth_settings.signing_key_id,
+        reload_interval: float = auth_settings.key_reload_interval_seconds,
+    ) -> None:
+        self.keys_dir = keys_dir
+        self.signing_kid = signing_kid
+        self.reload_interval = reload_interval
+        self.keys: dict[str, SigningKey] = {}
+        self.signing_key: SigningKey | None = None
+        # Incremented whenever a key is removed, so that cached verifications can be dropped
+        self.generation = 0
+        self.keys_by_header: dict[bytes, SigningKey] = {}
+        self.jwks: dict[str, Any] = {"keys": []}
+        self.jwks_etag = ""
+        self._mtimes: dict[Path, float] = {}
+        self._checked_at = 0.0
+        self.reload()
+
+    def _key_files(self) -> list[Path]:
+        if self.keys_dir is None:
+            return [auth_settings.private_key_path, auth_settings.public_key_path]
+        return sorted(
+            path
+            for path in self.keys_dir.iterdir()
+            if path.name.endswith(PRIVATE_KEY_SUFFIX) or path.name.endswith(PUBLIC_KEY_SUFFIX)
+        )
+
+    def _load_keys(self) -> tuple[dict[str, SigningKey], SigningKey]:
+        if self.keys_dir is None:
+            key = SigningKey.from_pem(auth_settings.private_key_path.read_bytes())
+            return {key.kid: key}, key
+
+        keys: dict[str, SigningKey] = {}
+        newest_private: tuple[float, str] | None = None
+        for path in self._key_files():
+            if path.name.endswith(PRIVATE_KEY_SUFFIX):
+                kid = path.name.removesuffix(PRIVATE_KEY_SUFFIX)
+                keys[kid] = SigningKey.from_pem(path.read_bytes(), kid=kid)
+                if newest_private is None or path.stat().st_mtime > newest_private[0]:
+                    newest_private = (path.stat().st_mtime, kid)
+            else:
+                kid = path.name.removesuffix(PUBLIC_KEY_SUFFIX)
+                keys.setdefault(kid, SigningKey.from_pem(path.read_bytes(), kid=kid))
+
+        signing_kid = self.signing_kid or (newest_private[1] if newest_private else None)
+        if signing_kid is None or signing_kid not in keys or keys[signing_kid].private_key is None:
+            raise ValueError(f"No private key for signing key id {signing_kid!r} in {self.keys_dir}")
+        return keys, keys[signing_kid]
+
+    def _current_mtimes(self) -> dict[Path, float]:
+        return {path: path.stat().st_mtime for path in self._key_files() if path.exists()}
+
+    def reload(self) -> None:
+        mtimes = self._current_mtimes()
+        keys, signing_key = self._load_keys()
+
+        if self.keys.keys() - keys.keys():
+            self.generation += 1
+
+        self.keys, self.signing_key, self._mtimes = keys, signing_key, mtimes
+        self.keys_by_header = {key.header_segment: key for key in keys.values()}
+        self.jwks = {"keys": [key.jwk for key in keys.values()]}
+        self.jwks_etag = '"' + hashlib.sha256(json.dumps(self.jwks, sort_keys=True).encode("utf-8")).hexdigest()[:32] + '"'
+        self._checked_at = time.monotonic()
+        logger.info("Loaded signing keys %s, signing with %r", list(keys), signing_key.kid)
+
+    def reload_if_changed(self, force: bool = False) -> None:
+        if not force and time.monotonic() - self._checked_at < self.reload_interval:
+            return
+
+        self._checked_at = time.monotonic()
+        try:
+            if self._current_mtimes() != self._mtimes:
+                self.reload()
+        except Exception:
+            # Keep the previous keys if the new files are missing or half written
+            logger.exception("Failed to reload signing keys")
+
+    def get_signing_key(self) -> SigningKey:
+        self.reload_if_changed()
+        return self.signing_key  # type: ignore
+
+    def get_verification_key(self, kid: str | None) -> SigningKey | None:
+        """Get the key a token with the given `kid` header was signed with.
+
+        Tokens issued before keys had ids are verified with the signing key.
+        """
+        self.reload_if_changed()
+        if kid is None:
+            return self.signing_key
+        return self.keys.get(kid)
+
+    def get_jwks(self) -> tuple[dict[str, Any], str]:
+        self.reload_if_changed()
+        return self.jwks, self.jwks_etag
+
+
+key_manager = KeyManager()
@@ -0,0 +1,116 @@
+import asyncio
+from typing import Any, Sequence
+from uuid import UUID
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from auth_service.database import async_session_maker
+from auth_service.auth.config import auth_settings
+from auth_service.auth.models import User
+from auth_service.auth.repository import UserRepository
+
+
+class UserLoader:
+    """Coalesces concurrent user lookups within a worker into batched queries.
+
+    Lookups of a value that is already being fetched wait for that fetch
+    (single-flight). Values requested in the same event loop iteration are
+    fetched together with one `UserRepository.get_many` call per field,
+    projection and choice of replica; while other fetches are running, values
+    requested within `window` seconds are added to the batch too, so that
+    lookups only wait for the window when there is load to batch.
+
+    Fetches use their own session, since they serve several requests at once,
+    so `UserRepository` only uses the loader while its session has not written.
+    """
+
+    def __init__(
+        self,
+        session_maker: async_sessionmaker[AsyncSession] = async_session_maker,
+        window: float = auth_settings.user_loader_window_seconds,
+        max_batch_size: int = auth_settings.user_lookup_chunk_size,
+    ) -> None:
+        self.session_maker = session_maker
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.loads = 0
+        self.coalesced = 0
+        self.batches = 0
+        self._futures: dict[tuple[str, Any, bool, Any], asyncio.Future[User | Row[Any] | None]] = {}
+        self._batches: dict[tuple[str, Any, bool], list[Any]] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def load(
+        self,
+        field: str,
+        value: Any,
+        columns: Sequence[str] | None = None,
+        replica: bool = True,
+    ) -> User | Row[Any] | None:
+        """Get the user whose `field` equals `value`, as a row of `columns` if they are given."""
+        if field == "id" and not isinstance(value, UUID):
+            value = UUID(str(value))
+        batch_key = (field, tuple(columns) if columns is not None else None, replica)
+
+        self.loads += 1
+        future = self._futures.get((*batch_key, value))
+        if future is not None:
+            self.coalesced += 1
+        else:
+            loop = asyncio.get_running_loop()
+            future = self._futures[(*batch_key, value)] = loop.create_future()
+            batch = self._batches.setdefault(batch_key, [])
+            batch.append(value)
+            if len(batch) >= self.max_batch_size:
+                self._dispatch(batch_key)
+            elif len(batch) == 1 and self._tasks:
+                loop.call_later(self.window, self._dispatch, batch_key)
+            elif len(batch) == 1:
+                loop.call_soon(self._dispatch, batch_key)
+
+        # A cancelled request must not cancel the lookup for the others waiting on it
+        return await asyncio.shield(future)
+
+    def _dispatch(self, batch_key: tuple[str, Any, bool]) -> None:
+        values = self._batches.pop(batch_key, None)
+        if not values:
+            return
+
+        task = asyncio.create_task(self._fetch(batch_key, values))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, batch_key: tuple[str, Any, bool], values: list[Any]) -> None:
+        field, columns, replica = batch_key
+        self.batches += 1
+        try:
+            async with self.session_maker() as session:
+                users = await UserRepository(session).get_many(
+                    field,
+                    values,
+                    chunk_size=self.max_batch_size,
+                    columns=columns,
+                    replica=replica,
+                )
+        except Exception as exc:
+            for value in values:
+                future = self._futures.pop((*batch_key, value))
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        users_by_value = {getattr(user, field): user for user in users}
+        for value in values:
+            future = self._futures.pop((*batch_key, value))
+            if not future.done():
+                future.set_result(users_by_value.get(value))
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+        }
+
+
+user_loader = UserLoader()
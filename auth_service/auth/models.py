@@ -1,3 +1,6 @@
+import datetime
+import uuid
+from sqlalchemy import DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from auth_service.models import Base
@@ -5,6 +8,11 @@ from auth_service.models import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Keyset pagination by (sort key, id)
+        Index("ix_users_username_id", "username", "id"),
+        Index("ix_users_email_id", "email", "id"),
+    )
 
     username: Mapped[str] = mapped_column(nullable=False, unique=True)
     email: Mapped[str] = mapped_column(nullable=False, unique=True)
@@ -12,3 +20,38 @@ class User(Base):
 
     is_active: Mapped[bool] = mapped_column(default=True)
     is_admin: Mapped[bool] = mapped_column(default=False)
+
+    # Bumped to invalidate every token issued to the user so far
+    token_version: Mapped[int] = mapped_column(default=0, server_default="0")
+
+
+class RefreshToken(Base):
+    """Issued refresh token; `id` is the token's `jti` claim."""
+
+    __tablename__ = "refresh_tokens"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    # All tokens rotated from the same login share a family
+    family_id: Mapped[uuid.UUID] = mapped_column(index=True)
+    expires_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), index=True)
+    used_at: Mapped[datetime.datetime | None] = mapped_column(DateTime(timezone=True))
+    revoked: Mapped[bool] = mapped_column(default=False)
+
+
+class TokenRevocation(Base):
+    """Revocation of a single access token (`jti`) or of all tokens of a user
+    older than `min_token_version`. Workers replay this log into memory.
+    """
+
+    __tablename__ = "token_revocations"
+
+    jti: Mapped[uuid.UUID | None]
+    user_id: Mapped[uuid.UUID | None]
+    min_token_version: Mapped[int | None]
+    # The revocation is dropped once every token it applies to has expired
+    expires_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), index=True)
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        index=True,
+    )
@@ -0,0 +1,61 @@
+import base64
+import binascii
+import functools
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+from typing import Any
+from uuid import UUID
+
+from auth_service.auth.config import auth_settings
+from auth_service.auth.exceptions import InvalidCursor
+
+
+logger = logging.getLogger(__name__)
+
+CURSOR_SORT_COLUMNS: tuple[str, ...] = ("id", "username", "email")
+CURSOR_SIGNATURE_SIZE: int = 16
+
+
+@functools.cache
+def _get_cursor_secret() -> bytes:
+    if auth_settings.cursor_secret:
+        return auth_settings.cursor_secret.encode("utf-8")
+
+    logger.warning("CURSOR_SECRET is not set, so pagination cursors are only accepted by the worker that issued them")
+    return secrets.token_bytes(32)
+
+
+def _sign(data: bytes) -> bytes:
+    return hmac.new(_get_cursor_secret(), data, hashlib.sha256).digest()[:CURSOR_SIGNATURE_SIZE]
+
+
+def encode_cursor(order: str, last_value: Any, last_id: UUID) -> str:
+    """Encode the sort key and id of the last row of a page into an opaque, signed cursor."""
+    data = json.dumps([order, str(last_value), str(last_id)], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(_sign(data) + data).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[str, Any, UUID]:
+    """Decode a cursor into the sort column, last sort value and last id."""
+    try:
+        raw_cursor = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    except (binascii.Error, ValueError) as exc:
+        raise InvalidCursor("Cursor is not valid base64") from exc
+
+    signature, data = raw_cursor[:CURSOR_SIGNATURE_SIZE], raw_cursor[CURSOR_SIGNATURE_SIZE:]
+    if not hmac.compare_digest(signature, _sign(data)):
+        raise InvalidCursor("Cursor signature does not match")
+
+    try:
+        order, last_value, last_id = json.loads(data)
+        last_id = UUID(last_id)
+    except (TypeError, ValueError) as exc:
+        raise InvalidCursor("Cursor payload is malformed") from exc
+
+    if order not in CURSOR_SORT_COLUMNS:
+        raise InvalidCursor(f"Cursor sort column {order!r} is not supported")
+
+    return order, (last_id if order == "id" else last_value), last_id
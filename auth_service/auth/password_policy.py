@@ -0,0 +1,133 @@
+import logging
+import time
+from typing import Literal
+import argon2
+import bcrypt
+from argon2.exceptions import InvalidHashError, VerificationError
+
+from auth_service.auth.config import auth_settings
+
+
+logger = logging.getLogger(__name__)
+
+BCRYPT_PREFIXES: tuple[str, ...] = ("$2a$", "$2b$", "$2y$")
+ARGON2ID_PREFIX: str = "$argon2id$"
+BCRYPT_MAX_ROUNDS: int = 16
+ARGON2_MAX_TIME_COST: int = 16
+
+
+class PasswordPolicy:
+    """Hashes new passwords with the preferred scheme and cost and verifies bcrypt and argon2id hashes.
+
+    A stored hash that uses another scheme or a lower cost than the policy needs
+    a rehash, which can be done on the next login when the password is known.
+    The policy is picklable, so process pools hash with the current costs.
+    """
+
+    def __init__(
+        self,
+        scheme: Literal["argon2id", "bcrypt"] = "bcrypt",
+        bcrypt_rounds: int = 12,
+        argon2_time_cost: int = 3,
+        argon2_memory_cost: int = 64 * 1024,
+        argon2_parallelism: int = 4,
+    ) -> None:
+        self.scheme = scheme
+        self.bcrypt_rounds = bcrypt_rounds
+        self.argon2_time_cost = argon2_time_cost
+        self.argon2_memory_cost = argon2_memory_cost
+        self.argon2_parallelism = argon2_parallelism
+
+    def _argon2_hasher(self) -> argon2.PasswordHasher:
+        return argon2.PasswordHasher(
+            time_cost=self.argon2_time_cost,
+            memory_cost=self.argon2_memory_cost,
+            parallelism=self.argon2_parallelism,
+            type=argon2.Type.ID,
+        )
+
+    def hash(self, password: str) -> str:
+        if self.scheme == "argon2id":
+            return self._argon2_hasher().hash(password)
+        salt = bcrypt.gensalt(rounds=self.bcrypt_rounds)
+        return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        if hashed_password.startswith(BCRYPT_PREFIXES):
+            try:
+                return bcrypt.checkpw(password.encode("utf-8"), hashed_password.encode("utf-8"))
+            except ValueError:
+                # Malformed hash
+                return False
+
+        if hashed_password.startswith(ARGON2ID_PREFIX):
+            try:
+                return self._argon2_hasher().verify(hashed_password, password)
+            except (VerificationError, InvalidHashError):
+                return False
+
+        return False
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Whether the hash uses another scheme or a lower cost than the policy.
+
+        Higher costs are kept, so that workers calibrated slightly differently do
+        not keep rehashing each other's hashes.
+        """
+        if self.scheme == "bcrypt":
+            if not hashed_password.startswith(BCRYPT_PREFIXES):
+                return True
+            try:
+                return int(hashed_password.split("$")[2]) < self.bcrypt_rounds
+            except (IndexError, ValueError):
+                return True
+
+        if not hashed_password.startswith(ARGON2ID_PREFIX):
+            return True
+        try:
+            parameters = argon2.extract_parameters(hashed_password)
+        except InvalidHashError:
+            return True
+        return (
+            parameters.time_cost < self.argon2_time_cost
+            or parameters.memory_cost < self.argon2_memory_cost
+        )
+
+    def _time_hash_ms(self) -> float:
+        started_at = time.perf_counter()
+        self.hash("calibration-password")
+        return (time.perf_counter() - started_at) * 1000
+
+    def calibrate(self, target_ms: float) -> None:
+        """Raise the cost while a hash takes less than `target_ms` on this host.
+
+        The configured cost is kept as the minimum. For argon2id only the time
+        cost is tuned, since the memory cost bounds memory per concurrent login.
+        """
+        if self.scheme == "bcrypt":
+            while self.bcrypt_rounds < BCRYPT_MAX_ROUNDS and self._time_hash_ms() * 2 <= target_ms:
+                # Every bcrypt round doubles the work
+                self.bcrypt_rounds += 1
+        else:
+            while self.argon2_time_cost < ARGON2_MAX_TIME_COST:
+                elapsed_ms = self._time_hash_ms()
+                if elapsed_ms * (self.argon2_time_cost + 1) / self.argon2_time_cost > target_ms:
+                    break
+                self.argon2_time_cost += 1
+
+        logger.info(
+            "Calibrated password hashing to %s (bcrypt rounds %d, argon2 time cost %d, %.0f ms)",
+            self.scheme,
+            self.bcrypt_rounds,
+            self.argon2_time_cost,
+            self._time_hash_ms(),
+        )
+
+
+password_policy = PasswordPolicy(
+    scheme=auth_settings.password_hash_scheme,
+    bcrypt_rounds=auth_settings.password_hash_bcrypt_rounds,
+    argon2_time_cost=auth_settings.password_hash_argon2_time_cost,
+    argon2_memory_cost=auth_settings.password_hash_argon2_memory_cost,
+    argon2_parallelism=auth_settings.password_hash_argon2_parallelism,
+)
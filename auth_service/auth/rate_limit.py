@@ -0,0 +1,222 @@
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from fastapi import Request
+
+from auth_service.config import settings
+from auth_service.auth.config import auth_settings
+from auth_service.auth.exceptions import RateLimitExceeded
+
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitBackend(ABC):
+    """Token buckets, failure counters and blocks, shared between workers if the backend is."""
+
+    @abstractmethod
+    async def take(self, key: str, capacity: int, refill_per_second: float) -> float:
+        """Take a token from the bucket; return 0 if one was available, else seconds until one is."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def add_failure(self, key: str, ttl: float) -> int:
+        """Count a failure, forgotten `ttl` seconds after the last one, and return the count."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def block(self, key: str, seconds: float) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def blocked_for(self, key: str) -> float:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def reset(self, *keys: str) -> None:
+        raise NotImplementedError
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Per-worker state, bounded to `max_entries` keys of each kind."""
+
+    def __init__(self, max_entries: int = 100_000) -> None:
+        self.max_entries = max_entries
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._failures: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        self._blocks: OrderedDict[str, float] = OrderedDict()
+
+    def _store(self, entries: OrderedDict, key: str, value: object) -> None:
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    async def take(self, key: str, capacity: int, refill_per_second: float) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (float(capacity), now))
+        tokens = min(float(capacity), tokens + (now - updated_at) * refill_per_second)
+
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / refill_per_second
+
+        self._store(self._buckets, key, (tokens, now))
+        return retry_after
+
+    async def add_failure(self, key: str, ttl: float) -> int:
+        now = time.monotonic()
+        count, expires_at = self._failures.get(key, (0, now))
+        count = count + 1 if expires_at > now else 1
+        self._store(self._failures, key, (count, now + ttl))
+        return count
+
+    async def block(self, key: str, seconds: float) -> None:
+        self._store(self._blocks, key, time.monotonic() + seconds)
+
+    async def blocked_for(self, key: str) -> float:
+        return max(0.0, self._blocks.get(key, 0.0) - time.monotonic())
+
+    async def reset(self, *keys: str) -> None:
+        for key in keys:
+            self._buckets.pop(key, None)
+            self._failures.pop(key, None)
+            self._blocks.pop(key, None)
+
+
+# Refills the bucket for the time since its last update, then takes a token if there is one
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_per_second = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated_at")
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * refill_per_second)
+
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / refill_per_second
+end
+
+redis.call("HSET", KEYS[1], "tokens", tokens, "updated_at", now)
+redis.call("PEXPIRE", KEYS[1], math.ceil(capacity / refill_per_second * 1000))
+return tostring(retry_after)
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    def __init__(self, url: str) -> None:
+        # Imported lazily since redis is an optional dependency
+        from redis.asyncio import Redis
+
+        self.client = Redis.from_url(url)
+        self._take = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, capacity: int, refill_per_second: float) -> float:
+        retry_after = await self._take(keys=[key], args=[capacity, refill_per_second, time.time()])
+        return float(retry_after)
+
+    async def add_failure(self, key: str, ttl: float) -> int:
+        async with self.client.pipeline(transaction=True) as pipeline:
+            pipeline.incr(key)
+            pipeline.pexpire(key, int(ttl * 1000))
+            count, _ = await pipeline.execute()
+        return count
+
+    async def block(self, key: str, seconds: float) -> None:
+        await self.client.set(key, b"1", px=max(1, int(seconds * 1000)))
+
+    async def blocked_for(self, key: str) -> float:
+        ttl = await self.client.pttl(key)
+        return max(0, ttl) / 1000
+
+    async def reset(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*keys)
+
+
+def get_rate_limit_backend() -> RateLimitBackend:
+    """Share rate limits between workers through Redis if it is configured."""
+    if settings.cache_settings.redis_url:
+        return RedisRateLimitBackend(settings.cache_settings.redis_url)
+    return InMemoryRateLimitBackend()
+
+
+def get_client_ip(request: Request) -> str:
+    if auth_settings.login_rate_limit_trust_forwarded_for:
+        forwarded_for = request.headers.get("X-Forwarded-For")
+        if forwarded_for:
+            return forwarded_for.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+class LoginRateLimiter:
+    """Rejects login attempts before the user is loaded or any password is hashed.
+
+    Attempts are limited with token buckets per client IP and per username, and
+    after `backoff_threshold` consecutive failures a username is blocked for a
+    delay that doubles with every further failure. If the backend is unavailable,
+    logins are let through rather than rejected.
+    """
+
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        ip_capacity: int = auth_settings.login_rate_limit_ip_capacity,
+        ip_refill_per_second: float = auth_settings.login_rate_limit_ip_refill_per_second,
+        username_capacity: int = auth_settings.login_rate_limit_username_capacity,
+        username_refill_per_second: float = auth_settings.login_rate_limit_username_refill_per_second,
+        backoff_threshold: int = auth_settings.login_backoff_threshold,
+        backoff_base_seconds: float = auth_settings.login_backoff_base_seconds,
+        backoff_max_seconds: float = auth_settings.login_backoff_max_seconds,
+    ) -> None:
+        self.backend = backend
+        self.ip_capacity = ip_capacity
+        self.ip_refill_per_second = ip_refill_per_second
+        self.username_capacity = username_capacity
+        self.username_refill_per_second = username_refill_per_second
+        self.backoff_threshold = backoff_threshold
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+
+    async def check(self, client_ip: str, username: str) -> None:
+        try:
+            retry_after = await self.backend.take(f"login:ip:{client_ip}", self.ip_capacity, self.ip_refill_per_second)
+            if not retry_after:
+                retry_after = await self.backend.blocked_for(f"login:block:{username}")
+            if not retry_after:
+                retry_after = await self.backend.take(
+                    f"login:username:{username}",
+                    self.username_capacity,
+                    self.username_refill_per_second,
+                )
+        except Exception:
+            logger.exception("Failed to check login rate limits")
+            return
+
+        if retry_after:
+            raise RateLimitExceeded(retry_after)
+
+    async def record_failure(self, username: str) -> None:
+        try:
+            failures = await self.backend.add_failure(f"login:failures:{username}", ttl=self.backoff_max_seconds)
+            if failures >= self.backoff_threshold:
+                delay = self.backoff_base_seconds * 2 ** min(failures - self.backoff_threshold, 32)
+                await self.backend.block(f"login:block:{username}", min(delay, self.backoff_max_seconds))
+        except Exception:
+            logger.exception("Failed to record a failed login")
+
+    async def record_success(self, username: str) -> None:
+        try:
+            await self.backend.reset(f"login:failures:{username}", f"login:block:{username}")
+        except Exception:
+            logger.exception("Failed to reset failed logins")
+
+
+login_rate_limiter = LoginRateLimiter(get_rate_limit_backend())
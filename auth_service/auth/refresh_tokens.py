@@ -0,0 +1,239 @@
+import asyncio
+import datetime
+import logging
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any
+from uuid import UUID
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth_service.database import async_session_maker
+from auth_service.jobs import job_queue
+from auth_service.auth.config import auth_settings
+from auth_service.auth.exceptions import InvalidRefreshToken, RefreshTokenReused
+from auth_service.auth.models import RefreshToken
+from auth_service.auth.scemas import RefreshTokenRecord, UserGet
+from auth_service.auth.utils import create_refresh_token
+
+
+logger = logging.getLogger(__name__)
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.UTC)
+
+
+class RefreshTokenStore(ABC):
+    @abstractmethod
+    async def add(self, record: RefreshTokenRecord) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get(self, jti: UUID) -> RefreshTokenRecord | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def consume(self, jti: UUID) -> RefreshTokenRecord | None:
+        """Mark the token as used if it is unused, not revoked and not expired, and return it."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def revoke_family(self, family_id: UUID) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def revoke_user(self, user_id: UUID) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def purge_expired(self, batch_size: int = 1000) -> int:
+        """Delete up to `batch_size` expired tokens and return how many were deleted."""
+        raise NotImplementedError
+
+
+class DatabaseRefreshTokenStore(RefreshTokenStore):
+    def __init__(self, async_session: AsyncSession) -> None:
+        self.async_session = async_session
+
+    @staticmethod
+    def _to_record(token: RefreshToken) -> RefreshTokenRecord:
+        return RefreshTokenRecord(
+            jti=token.id,
+            user_id=token.user_id,
+            family_id=token.family_id,
+            expires_at=token.expires_at,
+            used_at=token.used_at,
+            revoked=token.revoked,
+        )
+
+    async def add(self, record: RefreshTokenRecord) -> None:
+        self.async_session.add(
+            RefreshToken(
+                id=record.jti,
+                user_id=record.user_id,
+                family_id=record.family_id,
+                expires_at=record.expires_at,
+                used_at=record.used_at,
+                revoked=record.revoked,
+            )
+        )
+        await self.async_session.commit()
+
+    async def get(self, jti: UUID) -> RefreshTokenRecord | None:
+        result = await self.async_session.execute(select(RefreshToken).filter_by(id=jti))
+        token = result.scalar_one_or_none()
+        return self._to_record(token) if token else None
+
+    async def consume(self, jti: UUID) -> RefreshTokenRecord | None:
+        now = _now()
+        stmt = (
+            update(RefreshToken)
+            .where(
+                RefreshToken.id == jti,
+                RefreshToken.used_at.is_(None),
+                RefreshToken.revoked.is_(False),
+                RefreshToken.expires_at > now,
+            )
+            .values(used_at=now)
+            .returning(RefreshToken)
+        )
+        result = await self.async_session.execute(stmt)
+        token = result.scalar_one_or_none()
+        await self.async_session.commit()
+        return self._to_record(token) if token else None
+
+    async def revoke_family(self, family_id: UUID) -> None:
+        await self.async_session.execute(update(RefreshToken).filter_by(family_id=family_id).values(revoked=True))
+        await self.async_session.commit()
+
+    async def revoke_user(self, user_id: UUID) -> None:
+        await self.async_session.execute(update(RefreshToken).filter_by(user_id=user_id).values(revoked=True))
+        await self.async_session.commit()
+
+    async def purge_expired(self, batch_size: int = 1000) -> int:
+        expired = select(RefreshToken.id).where(RefreshToken.expires_at <= _now()).limit(batch_size)
+        result = await self.async_session.execute(
+            delete(RefreshToken).where(RefreshToken.id.in_(expired.scalar_subquery())).returning(RefreshToken.id)
+        )
+        purged = len(result.scalars().all())
+        await self.async_session.commit()
+        return purged
+
+
+class InMemoryRefreshTokenStore(RefreshTokenStore):
+    """Store for a single worker, used in development and tests."""
+
+    def __init__(self) -> None:
+        self._records: dict[UUID, RefreshTokenRecord] = {}
+
+    async def add(self, record: RefreshTokenRecord) -> None:
+        self._records[record.jti] = record.model_copy()
+
+    async def get(self, jti: UUID) -> RefreshTokenRecord | None:
+        record = self._records.get(jti)
+        return record.model_copy() if record else None
+
+    async def consume(self, jti: UUID) -> RefreshTokenRecord | None:
+        record = self._records.get(jti)
+        now = _now()
+        if record is None or record.used_at is not None or record.revoked or record.expires_at <= now:
+            return None
+
+        record.used_at = now
+        return record.model_copy()
+
+    async def revoke_family(self, family_id: UUID) -> None:
+        for record in self._records.values():
+            if record.family_id == family_id:
+                record.revoked = True
+
+    async def revoke_user(self, user_id: UUID) -> None:
+        for record in self._records.values():
+            if record.user_id == user_id:
+                record.revoked = True
+
+    async def purge_expired(self, batch_size: int = 1000) -> int:
+        now = _now()
+        expired = [jti for jti, record in self._records.items() if record.expires_at <= now][:batch_size]
+        for jti in expired:
+            del self._records[jti]
+        return len(expired)
+
+
+in_memory_refresh_token_store = InMemoryRefreshTokenStore()
+
+
+def get_refresh_token_store_for_session(async_session: AsyncSession) -> RefreshTokenStore:
+    if auth_settings.refresh_token_store == "memory":
+        return in_memory_refresh_token_store
+    return DatabaseRefreshTokenStore(async_session)
+
+
+async def issue_refresh_token(
+    store: RefreshTokenStore,
+    user: UserGet,
+    family_id: UUID | None = None,
+) -> str:
+    """Create a refresh token and record it in the store.
+
+    A new family is started unless the token is rotated from an existing one.
+    """
+    jti = uuid.uuid4()
+    await store.add(
+        RefreshTokenRecord(
+            jti=jti,
+            user_id=user.id,
+            family_id=family_id or jti,
+            expires_at=_now() + datetime.timedelta(minutes=auth_settings.refresh_token_expire_minutes),
+        )
+    )
+    return create_refresh_token(user, jti=jti)
+
+
+async def rotate_refresh_token(store: RefreshTokenStore, jti: UUID) -> RefreshTokenRecord:
+    """Consume a refresh token so that it cannot be used again.
+
+    Presenting a token that was already used means it has leaked, so every token
+    of its family is revoked.
+    """
+    record = await store.consume(jti)
+    if record is not None:
+        return record
+
+    record = await store.get(jti)
+    if record is not None and record.used_at is not None and not record.revoked:
+        await store.revoke_family(record.family_id)
+        raise RefreshTokenReused(f"Refresh token {jti} was already used")
+
+    raise InvalidRefreshToken(f"Refresh token {jti} is unknown, expired or revoked")
+
+
+async def purge_expired_refresh_tokens() -> int:
+    """Delete all expired refresh tokens in batches."""
+    purged = 0
+    async with async_session_maker() as session:
+        store = get_refresh_token_store_for_session(session)
+        while True:
+            batch_purged = await store.purge_expired(auth_settings.refresh_token_cleanup_batch_size)
+            purged += batch_purged
+            if batch_purged < auth_settings.refresh_token_cleanup_batch_size:
+                return purged
+
+
+PURGE_EXPIRED_REFRESH_TOKENS_JOB = "purge_expired_refresh_tokens"
+
+
+async def _purge_expired_refresh_tokens_job(payloads: list[dict[str, Any]]) -> None:
+    purged = await purge_expired_refresh_tokens()
+    logger.info("Purged %d expired refresh tokens", purged)
+
+
+job_queue.register(PURGE_EXPIRED_REFRESH_TOKENS_JOB, _purge_expired_refresh_tokens_job)
+
+
+async def purge_expired_refresh_tokens_periodically() -> None:
+    """Queue a purge every interval; the queue retries failed purges and merges pending ones."""
+    while True:
+        await asyncio.sleep(auth_settings.refresh_token_cleanup_interval_seconds)
+        job_queue.enqueue(PURGE_EXPIRED_REFRESH_TOKENS_JOB, {}, key="all")
@@ -1,13 +1,148 @@
-from typing import Any
-from sqlalchemy import select, update, delete
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Hashable, Sequence
+from uuid import UUID
+from sqlalchemy import Result, Row, Select, bindparam, select, update, delete, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from auth_service.auth.models import User
+from auth_service.auth.exceptions import InvalidSortOrder
+
+if TYPE_CHECKING:
+    from auth_service.auth.loader import UserLoader
+
+
+# Unique, indexed columns users can be looked up by in bulk
+USER_LOOKUP_FIELDS: tuple[str, ...] = ("id", "username", "email")
+
+# Bind arguments of the reads that a read replica may serve, see RoutingSession
+REPLICA_READ: dict[str, Any] = {"replica": True}
+
+# Columns user listings can be sorted by
+USER_SORT_COLUMNS: tuple[str, ...] = ("id", "username", "email", "is_active")
+
+# Postgres accepts at most 32767 bind parameters per statement, and every inserted row binds each column
+USER_INSERT_CHUNK_SIZE = 32767 // len(User.__table__.columns)
+
+
+def _select_user(columns: Sequence[str] | None) -> Select[Any]:
+    """Select whole users, or only the given columns as rows."""
+    if columns is None:
+        return select(User)
+    return select(*(getattr(User, column) for column in columns))
+
+
+class StatementCatalog:
+    """Statements of the hot user queries, built once per shape and reused.
+
+    Values are bound at execution, so every call of a shape sends the same SQL:
+    SQLAlchemy finds it in its compiled cache without building the statement
+    again, and asyncpg reuses the statement prepared on the connection.
+    """
+
+    def __init__(self) -> None:
+        self.statements: dict[Hashable, Select[Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, build: Callable[[], Select[Any]]) -> Select[Any]:
+        statement = self.statements.get(key)
+        if statement is None:
+            self.misses += 1
+            statement = self.statements[key] = build()
+        else:
+            self.hits += 1
+        return statement
+
+    def lookup(self, field: str, columns: tuple[str, ...] | None) -> Select[Any]:
+        """Select the user whose `field` equals the `value` parameter."""
+        return self.get(
+            ("lookup", field, columns),
+            lambda: _select_user(columns).where(getattr(User, field) == bindparam("value")),
+        )
+
+    def lookup_many(self, field: str, columns: tuple[str, ...] | None) -> Select[Any]:
+        """Select the users whose `field` is one of the `values` parameter."""
+        return self.get(
+            ("lookup_many", field, columns),
+            lambda: _select_user(columns).where(getattr(User, field).in_(bindparam("values", expanding=True))),
+        )
+
+    def page(self, order: str, columns: tuple[str, ...] | None) -> Select[Any]:
+        """Select users sorted by `order`, with `offset` and `limit` parameters."""
+        return self.get(
+            ("page", order, columns),
+            lambda: (
+                _select_user(columns)
+                .order_by(getattr(User, order))
+                .offset(bindparam("offset"))
+                .limit(bindparam("limit"))
+            ),
+        )
+
+    def page_after(self, order: str, columns: tuple[str, ...] | None, has_after: bool) -> Select[Any]:
+        """Select users sorted by `order` and id, with `limit` and, if `has_after`,
+        `last_value` and `last_id` parameters of the row to start after.
+        """
+
+        def build() -> Select[Any]:
+            column = getattr(User, order)
+            query = _select_user(columns)
+            if has_after:
+                last_id = bindparam("last_id", type_=User.id.type)
+                if order == "id":
+                    query = query.where(User.id > last_id)
+                else:
+                    last_value = bindparam("last_value", type_=column.type)
+                    query = query.where(tuple_(column, User.id) > tuple_(last_value, last_id))
+            return query.order_by(column, User.id).limit(bindparam("limit"))
+
+        return self.get(("page_after", order, columns, has_after), build)
+
+    def all(self, order: str, columns: tuple[str, ...] | None) -> Select[Any]:
+        """Select all users sorted by `order`."""
+        return self.get(("all", order, columns), lambda: _select_user(columns).order_by(getattr(User, order)))
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "statements": len(self.statements),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+user_statements = StatementCatalog()
+
+
+def _check_order(order: str) -> None:
+    if order not in USER_SORT_COLUMNS:
+        raise InvalidSortOrder(f"Users cannot be sorted by {order!r}")
 
 
 class UserRepository:
-    def __init__(self, async_session: AsyncSession) -> None:
+    """Queries of the users table.
+
+    With a `loader`, lookups of a single user by one of `USER_LOOKUP_FIELDS` go
+    through it and are coalesced with the concurrent lookups of other requests.
+
+    Lookups take the `columns` the caller needs and then return rows of only those
+    columns, which keeps unneeded ones such as `hashed_password` off the wire.
+
+    Reads go to a read replica if one is configured and keeps up with the
+    primary; lookups with `replica=False` always read from the primary.
+    """
+
+    def __init__(self, async_session: AsyncSession, loader: "UserLoader | None" = None) -> None:
         self.async_session = async_session
+        self.loader = loader
+
+    def _can_use_loader(self) -> bool:
+        """Whether lookups may go through the loader, whose own session does not see
+        the writes this session has pending or not yet committed.
+        """
+        session = self.async_session
+        return self.loader is not None and not (
+            session.info.get("has_written") or session.new or session.dirty or session.deleted
+        )
 
     async def create(
         self,
@@ -19,13 +154,88 @@ class UserRepository:
         await self.async_session.refresh(user)
         return user
 
+    async def create_many(
+        self,
+        data: Sequence[dict[str, Any]],
+    ) -> set[UUID]:
+        """Insert users in one transaction, skipping rows that conflict with existing ones.
+
+        Rows are inserted `USER_INSERT_CHUNK_SIZE` per statement. Every row must
+        have an id; the ids of the rows that were inserted are returned.
+        """
+        if not data:
+            return set()
+
+        created_ids: set[UUID] = set()
+        for start in range(0, len(data), USER_INSERT_CHUNK_SIZE):
+            chunk = list(data[start : start + USER_INSERT_CHUNK_SIZE])
+            stmt = insert(User).values(chunk).on_conflict_do_nothing().returning(User.id)
+            result = await self.async_session.execute(stmt)
+            created_ids.update(result.scalars().all())
+        await self.async_session.commit()
+        return created_ids
+
     async def get_single(
         self,
+        columns: Sequence[str] | None = None,
+        replica: bool = True,
         **filters,
-    ) -> User | None:
-        query = select(User).filter_by(**filters)
-        result = await self.async_session.execute(query)
-        return result.scalar_one_or_none()
+    ) -> User | Row[Any] | None:
+        bind_arguments = REPLICA_READ if replica else None
+        if self._can_use_loader() and len(filters) == 1 and next(iter(filters)) in USER_LOOKUP_FIELDS:
+            field, value = next(iter(filters.items()))
+            return await self.loader.load(field, value, columns, replica=replica)
+
+        if len(filters) == 1 and next(iter(filters)) in USER_LOOKUP_FIELDS:
+            field, value = next(iter(filters.items()))
+            query = user_statements.lookup(field, tuple(columns) if columns is not None else None)
+            result = await self.async_session.execute(query, {"value": value}, bind_arguments=bind_arguments)
+        else:
+            query = _select_user(columns).filter_by(**filters)
+            result = await self.async_session.execute(query, bind_arguments=bind_arguments)
+        return result.scalar_one_or_none() if columns is None else result.one_or_none()
+
+    async def get_many(
+        self,
+        field: str,
+        values: Sequence[Any],
+        chunk_size: int = 1000,
+        columns: Sequence[str] | None = None,
+        replica: bool = True,
+    ) -> list[User] | list[Row[Any]]:
+        """Get the users whose `field` is one of `values`, with one query per `chunk_size` values.
+
+        If `columns` are given, rows of those columns and `field` are returned instead of users.
+        """
+        if field not in USER_LOOKUP_FIELDS:
+            raise ValueError(f"Users cannot be looked up by {field!r}")
+        if columns is not None:
+            columns = tuple(columns) if field in columns else (field, *columns)
+
+        query = user_statements.lookup_many(field, columns)
+        users: list[Any] = []
+        for start in range(0, len(values), chunk_size):
+            result = await self.async_session.execute(
+                query,
+                {"values": list(values[start:start + chunk_size])},
+                bind_arguments=REPLICA_READ if replica else None,
+            )
+            users.extend(result.scalars().all() if columns is None else result.all())
+        return users
+
+    async def get_token_state(
+        self,
+        id: UUID,
+    ) -> tuple[bool, int] | None:
+        # Read from the primary, since a lagging replica would still accept revoked tokens
+        if self._can_use_loader():
+            user = await self.loader.load("id", id, ("is_active", "token_version"), replica=False)  # type: ignore
+            return (user.is_active, user.token_version) if user else None
+
+        query = user_statements.lookup("id", ("is_active", "token_version"))
+        result = await self.async_session.execute(query, {"value": id})
+        row = result.one_or_none()
+        return (row.is_active, row.token_version) if row else None
 
     async def get_multiple(
         self,
@@ -33,26 +243,112 @@ class UserRepository:
         offset: int = 0,
         limit: int = 100,
     ) -> list[User]:
-        query = select(User).order_by(order).offset(offset).limit(limit)
+        _check_order(order)
+        query = user_statements.page(order, None)
+
+        result = await self.async_session.execute(
+            query,
+            {"offset": offset, "limit": limit},
+            bind_arguments=REPLICA_READ,
+        )
+        return list(result.scalars().all())
+
+    async def get_multiple_rows(
+        self,
+        columns: Sequence[str],
+        order: str = "id",
+        offset: int = 0,
+        limit: int = 100,
+    ) -> list[Row[Any]]:
+        """Like `get_multiple`, but get only `columns` as rows, without loading ORM objects."""
+        _check_order(order)
+        query = user_statements.page(order, tuple(columns))
+
+        result = await self.async_session.execute(
+            query,
+            {"offset": offset, "limit": limit},
+            bind_arguments=REPLICA_READ,
+        )
+        return list(result.all())
 
-        result = await self.async_session.execute(query)
+    async def get_multiple_after(
+        self,
+        order: str = "id",
+        after: tuple[Any, UUID] | None = None,
+        limit: int = 100,
+    ) -> list[User]:
+        """Get users sorted by `order` and id that come after the (value, id) pair."""
+        result = await self._execute_page_after(None, order, after, limit)
         return list(result.scalars().all())
 
+    async def get_multiple_rows_after(
+        self,
+        columns: Sequence[str],
+        order: str = "id",
+        after: tuple[Any, UUID] | None = None,
+        limit: int = 100,
+    ) -> list[Row[Any]]:
+        """Like `get_multiple_after`, but get only `columns` as rows, without loading ORM objects."""
+        result = await self._execute_page_after(tuple(columns), order, after, limit)
+        return list(result.all())
+
+    async def _execute_page_after(
+        self,
+        columns: tuple[str, ...] | None,
+        order: str,
+        after: tuple[Any, UUID] | None,
+        limit: int,
+    ) -> Result[Any]:
+        _check_order(order)
+        query = user_statements.page_after(order, columns, has_after=after is not None)
+
+        params: dict[str, Any] = {"limit": limit}
+        if after is not None:
+            params["last_value"], params["last_id"] = after
+        return await self.async_session.execute(query, params, bind_arguments=REPLICA_READ)
+
+    async def stream_multiple(
+        self,
+        columns: Sequence[str],
+        order: str = "id",
+        chunk_size: int = 1000,
+    ) -> AsyncIterator[Sequence[Row[Any]]]:
+        """Stream chunks of user rows through a server-side cursor."""
+        _check_order(order)
+        query = user_statements.all(order, tuple(columns))
+
+        result = await self.async_session.stream(
+            query,
+            execution_options={"yield_per": chunk_size},
+            bind_arguments=REPLICA_READ,
+        )
+        async for rows in result.partitions():
+            yield rows
+
     async def update(
         self,
         data: dict[str, Any],
         **filters,
     ) -> User:
         stmt = update(User).filter_by(**filters).values(**data).returning(User)
-        user = await self.async_session.execute(stmt)
+        result = await self.async_session.execute(stmt)
+        user = result.scalar_one()
+        await self.async_session.commit()
 
-        return user.scalar_one()
+        return user
+
+    async def increment_token_version(
+        self,
+        **filters,
+    ) -> User:
+        return await self.update(data={"token_version": User.token_version + 1}, **filters)
 
     async def delete(
         self,
         **filters,
-    ) -> None:
-        stmt = delete(User).filter_by(**filters)
+    ) -> list[UUID]:
+        stmt = delete(User).filter_by(**filters).returning(User.id)
 
-        await self.async_session.execute(stmt)
+        result = await self.async_session.execute(stmt)
         await self.async_session.commit()
+        return list(result.scalars().all())
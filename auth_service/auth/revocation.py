@@ -0,0 +1,167 @@
+import asyncio
+import datetime
+import logging
+import time
+from typing import Any
+from uuid import UUID
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from auth_service.database import async_session_maker
+from auth_service.auth.config import auth_settings
+from auth_service.auth.models import TokenRevocation
+from auth_service.auth.utils import TOKEN_VERSION_FIELD
+
+
+logger = logging.getLogger(__name__)
+
+# Revokes every token of a deleted user, whatever its version
+DELETED_USER_TOKEN_VERSION: int = 2**31 - 1
+
+
+class RevocationList:
+    """In-memory set of revoked token ids and per-user minimum token versions.
+
+    Checking a token is two dict lookups; entries are pruned once every token
+    they apply to has expired, so the structure stays small.
+    """
+
+    def __init__(self) -> None:
+        self._jtis: dict[str, float] = {}
+        self._user_versions: dict[str, tuple[int, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._jtis) + len(self._user_versions)
+
+    def add(
+        self,
+        expires_at: float,
+        jti: UUID | str | None = None,
+        user_id: UUID | str | None = None,
+        min_token_version: int | None = None,
+    ) -> None:
+        if jti is not None:
+            self._jtis[str(jti)] = max(expires_at, self._jtis.get(str(jti), 0.0))
+
+        if user_id is not None and min_token_version is not None:
+            version, version_expires_at = self._user_versions.get(str(user_id), (0, 0.0))
+            self._user_versions[str(user_id)] = (
+                max(version, min_token_version),
+                max(version_expires_at, expires_at),
+            )
+
+    def is_revoked(self, token_payload: dict[str, Any]) -> bool:
+        if token_payload.get("jti") in self._jtis:
+            return True
+
+        user_version = self._user_versions.get(token_payload.get("sub"))  # type: ignore
+        return user_version is not None and token_payload.get(TOKEN_VERSION_FIELD, 0) < user_version[0]
+
+    def prune(self) -> None:
+        now = time.time()
+        self._jtis = {jti: expires_at for jti, expires_at in self._jtis.items() if expires_at > now}
+        self._user_versions = {
+            user_id: entry for user_id, entry in self._user_versions.items() if entry[1] > now
+        }
+
+
+revocation_list = RevocationList()
+
+
+class TokenRevoker:
+    """Records revocations in the shared log and applies them to this worker at once."""
+
+    def __init__(self, async_session: AsyncSession, revocations: RevocationList = revocation_list) -> None:
+        self.async_session = async_session
+        self.revocations = revocations
+
+    async def _revoke(self, revocation: TokenRevocation) -> None:
+        self.async_session.add(revocation)
+        await self.async_session.commit()
+        self.revocations.add(
+            expires_at=revocation.expires_at.timestamp(),
+            jti=revocation.jti,
+            user_id=revocation.user_id,
+            min_token_version=revocation.min_token_version,
+        )
+
+    async def revoke_token(self, jti: UUID, expires_at: datetime.datetime) -> None:
+        """Revoke a single access token until it expires."""
+        await self._revoke(TokenRevocation(jti=jti, expires_at=expires_at))
+
+    async def revoke_user(self, user_id: UUID, min_token_version: int) -> None:
+        """Revoke every access token of the user with a version below `min_token_version`."""
+        expires_at = datetime.datetime.now(datetime.UTC) + datetime.timedelta(
+            minutes=auth_settings.access_token_expire_minutes,
+        )
+        await self._revoke(
+            TokenRevocation(user_id=user_id, min_token_version=min_token_version, expires_at=expires_at)
+        )
+
+
+class RevocationSync:
+    """Incrementally replays the shared revocation log into a worker's `RevocationList`.
+
+    Each sync reads the rows created since the previous one, minus an overlap that
+    covers transactions committed out of order.
+    """
+
+    def __init__(
+        self,
+        revocations: RevocationList = revocation_list,
+        session_maker: async_sessionmaker[AsyncSession] = async_session_maker,
+        interval: float = auth_settings.token_revocation_sync_interval_seconds,
+        overlap: float = auth_settings.token_revocation_sync_overlap_seconds,
+        purge_interval: float = auth_settings.token_revocation_purge_interval_seconds,
+    ) -> None:
+        self.revocations = revocations
+        self.session_maker = session_maker
+        self.interval = interval
+        self.overlap = datetime.timedelta(seconds=overlap)
+        self.purge_interval = purge_interval
+        self.last_created_at: datetime.datetime | None = None
+        self.last_purged_at = time.monotonic()
+
+    async def sync(self) -> int:
+        query = select(TokenRevocation).where(TokenRevocation.expires_at > datetime.datetime.now(datetime.UTC))
+        if self.last_created_at is not None:
+            query = query.where(TokenRevocation.created_at > self.last_created_at - self.overlap)
+
+        async with self.session_maker() as session:
+            result = await session.execute(query)
+            rows = result.scalars().all()
+
+        for row in rows:
+            self.revocations.add(
+                expires_at=row.expires_at.timestamp(),
+                jti=row.jti,
+                user_id=row.user_id,
+                min_token_version=row.min_token_version,
+            )
+            if self.last_created_at is None or row.created_at > self.last_created_at:
+                self.last_created_at = row.created_at
+
+        self.revocations.prune()
+        return len(rows)
+
+    async def purge_expired(self) -> None:
+        async with self.session_maker() as session:
+            await session.execute(
+                delete(TokenRevocation).where(TokenRevocation.expires_at <= datetime.datetime.now(datetime.UTC))
+            )
+            await session.commit()
+        self.last_purged_at = time.monotonic()
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.sync()
+                if time.monotonic() - self.last_purged_at >= self.purge_interval:
+                    await self.purge_expired()
+            except Exception:
+                logger.exception("Failed to sync token revocations")
+
+            await asyncio.sleep(self.interval)
+
+
+revocation_sync = RevocationSync()
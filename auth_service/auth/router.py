@@ -1,22 +1,43 @@
-from sqlalchemy.exc import IntegrityError, CompileError, DBAPIError
-from fastapi import APIRouter, HTTPException, Depends, status
+import datetime
+from typing import Any, Literal
+from uuid import UUID
+from sqlalchemy.exc import IntegrityError, DBAPIError
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 
+from auth_service.auth.config import auth_settings
+from auth_service.auth.keys import key_manager
 from auth_service.auth.service import UserService
-from auth_service.auth.exceptions import UserNotFound
-from auth_service.auth.utils import create_access_token, create_refresh_token
+from auth_service.auth.exceptions import UserNotFound, PasswordHasherOverloaded, InvalidCursor, InvalidSortOrder
+from auth_service.auth.utils import create_access_token
+from auth_service.auth.refresh_tokens import RefreshTokenStore, issue_refresh_token
+from auth_service.auth.revocation import TokenRevoker, DELETED_USER_TOKEN_VERSION
+from auth_service.auth.export import EXPORT_MEDIA_TYPES, export_users
+from auth_service.auth.bulk_import import iter_lines
+from auth_service.auth.introspection import introspect_tokens
 from auth_service.auth.scemas import (
     UserCreate,
     UserGet,
     UserGetWithPassword,
+    UserGetWithVersion,
     UserUpdate,
+    UserLookup,
+    UserImportReport,
+    RefreshTokenRecord,
     Token,
+    TokenIntrospection,
+    TokenIntrospectionRequest,
 )
 from auth_service.auth.dependencies import (
     get_current_active_user,
     get_user_service,
     authenticate_user,
     get_current_user,
-    get_current_user_for_refresh,
+    get_current_admin_user,
+    get_refresh_token_store,
+    get_refresh_token_record,
+    get_current_token_payload,
+    get_token_revoker,
 )
 
 
@@ -30,14 +51,43 @@ users_router = APIRouter(
     tags=["Users"],
 )
 
+well_known_router = APIRouter(
+    prefix="/.well-known",
+    tags=["Keys"],
+)
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison of an ETag with an If-None-Match list, as for GET requests."""
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+# Public keys for verifying tokens
+@well_known_router.get("/jwks.json")
+async def get_jwks(request: Request) -> Response:
+    jwks, etag = key_manager.get_jwks()
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={auth_settings.jwks_max_age_seconds}",
+    }
+
+    if _etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse(jwks, headers=headers)
+
 
 # JWT auth endpoints
 @auth_router.post("/login")
 async def get_jwt_token(
     user: UserGetWithPassword = Depends(authenticate_user),
+    refresh_token_store: RefreshTokenStore = Depends(get_refresh_token_store),
 ) -> Token:
     access_token = create_access_token(user)
-    refresh_token = create_refresh_token(user)
+    refresh_token = await issue_refresh_token(refresh_token_store, user)
 
     return Token(
         access_token=access_token,
@@ -46,14 +96,76 @@ async def get_jwt_token(
 
 
 @auth_router.post("/refresh", response_model_exclude_none=True)
-async def refresh_access_token(user: UserGet = Depends(get_current_user_for_refresh)) -> Token:
+async def refresh_access_token(
+    record: RefreshTokenRecord = Depends(get_refresh_token_record),
+    refresh_token_store: RefreshTokenStore = Depends(get_refresh_token_store),
+    user_service: UserService = Depends(get_user_service),
+) -> Token:
+    try:
+        user: UserGetWithVersion = await user_service.get_user(  # type: ignore
+            include_version=True,
+            id=record.user_id,
+        )
+    except UserNotFound as exc:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+        ) from exc
+
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Inactive user",
+        )
+
     access_token = create_access_token(user)
+    refresh_token = await issue_refresh_token(refresh_token_store, user, family_id=record.family_id)
 
     return Token(
         access_token=access_token,
+        refresh_token=refresh_token,
     )
 
 
+@auth_router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    token_payload: dict[str, Any] = Depends(get_current_token_payload),
+    token_revoker: TokenRevoker = Depends(get_token_revoker),
+) -> None:
+    """Revoke the access token used for this request."""
+    if token_payload.get("jti") is not None:
+        await token_revoker.revoke_token(
+            jti=UUID(token_payload["jti"]),
+            expires_at=datetime.datetime.fromtimestamp(token_payload["exp"], datetime.UTC),
+        )
+
+
+@auth_router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT)
+async def logout_everywhere(
+    user: UserGet = Depends(get_current_user),
+    refresh_token_store: RefreshTokenStore = Depends(get_refresh_token_store),
+    token_revoker: TokenRevoker = Depends(get_token_revoker),
+    user_service: UserService = Depends(get_user_service),
+) -> None:
+    """Revoke every refresh and access token issued to the current user."""
+    await refresh_token_store.revoke_user(user.id)
+    token_version = await user_service.revoke_tokens(id=user.id)
+    await token_revoker.revoke_user(user.id, min_token_version=token_version)
+
+
+@auth_router.post(
+    "/introspect",
+    response_model_exclude_none=True,
+    dependencies=[Depends(get_current_admin_user)],
+)
+async def introspect(
+    data: TokenIntrospectionRequest,
+    user_service: UserService = Depends(get_user_service),
+) -> list[TokenIntrospection]:
+    """Check many access tokens at once, for gateways; results are in the order of the tokens."""
+    return await introspect_tokens(data.tokens, user_service)
+
+
 # Users endpoints
 @users_router.post("/")
 async def create_user(
@@ -67,6 +179,42 @@ async def create_user(
             status_code=status.HTTP_409_CONFLICT,
             detail="Username or email already exists",
         ) from exc
+    except PasswordHasherOverloaded as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many users are being created, try again later",
+            headers={"Retry-After": "1"},
+        ) from exc
+
+
+@users_router.post("/import", dependencies=[Depends(get_current_admin_user)])
+async def import_users(
+    request: Request,
+    import_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    user_service: UserService = Depends(get_user_service),
+) -> UserImportReport:
+    try:
+        return await user_service.import_users(iter_lines(request.stream()), import_format)
+    except PasswordHasherOverloaded as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Another import is in progress, try again later",
+            headers={"Retry-After": "60"},
+        ) from exc
+
+
+@users_router.post("/lookup", dependencies=[Depends(get_current_active_user)])
+async def lookup_users(
+    data: UserLookup,
+    user_service: UserService = Depends(get_user_service),
+) -> dict[str, UserGet | None]:
+    """Get many users by id or username at once, keyed by the given values; unknown ones are null."""
+    if data.ids is not None:
+        users = await user_service.get_users_by("id", data.ids)
+        return {str(id): users.get(id) for id in data.ids}
+
+    users = await user_service.get_users_by("username", data.usernames)  # type: ignore
+    return {username: users.get(username) for username in data.usernames}  # type: ignore
 
 
 @users_router.get("/me")
@@ -76,16 +224,32 @@ def get_current_user_info(
     return user
 
 
-@users_router.get("/")
+@users_router.get("/", response_model=list[UserGet], dependencies=[Depends(get_current_active_user)])
 async def get_users(
     order: str = "id",
     offset: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, le=auth_settings.user_listing_max_limit),
+    cursor: str | None = None,
     user_service: UserService = Depends(get_user_service),
-) -> list[UserGet]:
+) -> ORJSONResponse:
+    """Get users with offset pagination, or with keyset pagination if `cursor` is given.
+
+    When a full page sorted by id, username or email is returned, the cursor of the
+    next page is sent in the `X-Next-Cursor` header. The rows are encoded as they
+    are read, without being validated into `UserGet` models first.
+    """
     try:
-        return await user_service.get_users(order=order, offset=offset, limit=limit)
-    except CompileError as exc:
+        if cursor is not None:
+            users, next_cursor = await user_service.get_users_page(cursor=cursor, limit=limit)
+        else:
+            users = await user_service.get_users(order=order, offset=offset, limit=limit)
+            next_cursor = user_service.get_next_cursor(users, order=order, limit=limit)
+    except InvalidCursor as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Invalid cursor",
+        ) from exc
+    except InvalidSortOrder as exc:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail="Invalid value of order",
@@ -96,6 +260,20 @@ async def get_users(
             detail="Limit and offset must be positive integers or 0",
         ) from exc
 
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor is not None else None
+    return ORJSONResponse([user._asdict() for user in users], headers=headers)
+
+
+@users_router.get("/export", dependencies=[Depends(get_current_admin_user)])
+async def export_all_users(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+) -> StreamingResponse:
+    return StreamingResponse(
+        export_users(export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="users.{export_format}"'},
+    )
+
 
 @users_router.get("/{username}")
 async def get_user_by_username(
@@ -130,5 +308,7 @@ async def update_user(
 async def delete_user(
     user: UserGet = Depends(get_current_user),
     user_service: UserService = Depends(get_user_service),
+    token_revoker: TokenRevoker = Depends(get_token_revoker),
 ) -> None:
     await user_service.delete_user(id=user.id)
+    await token_revoker.revoke_user(user.id, min_token_version=DELETED_USER_TOKEN_VERSION)
@@ -1,5 +1,9 @@
+import datetime
+from typing import Literal
 from uuid import UUID
-from pydantic import BaseModel, ConfigDict, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, model_validator
+
+from auth_service.auth.config import auth_settings
 
 
 class BaseChema(BaseModel):
@@ -19,10 +23,27 @@ class UserGet(BaseChema):
     is_active: bool
 
 
-class UserGetWithPassword(UserGet):
+class UserGetWithVersion(UserGet):
+    token_version: int = 0
+
+
+class UserGetWithPassword(UserGetWithVersion):
     hashed_password: str
 
 
+class UserLookup(BaseChema):
+    """Ids or usernames of users to get at once; exactly one of the lists must be given."""
+
+    ids: list[UUID] | None = Field(None, min_length=1, max_length=auth_settings.user_lookup_max_values)
+    usernames: list[str] | None = Field(None, min_length=1, max_length=auth_settings.user_lookup_max_values)
+
+    @model_validator(mode="after")
+    def check_one_list(self) -> "UserLookup":
+        if (self.ids is None) == (self.usernames is None):
+            raise ValueError("Exactly one of ids or usernames must be given")
+        return self
+
+
 class UserUpdate(BaseChema):
     username: str | None = None
     email: EmailStr | None = None
@@ -32,3 +53,43 @@ class Token(BaseChema):
     access_token: str
     refresh_token: str | None = None
     token_type: str = "Bearer"
+
+
+class RefreshTokenRecord(BaseChema):
+    jti: UUID
+    user_id: UUID
+    family_id: UUID
+    expires_at: datetime.datetime
+    used_at: datetime.datetime | None = None
+    revoked: bool = False
+
+
+class UserImportRowResult(BaseChema):
+    row: int
+    username: str | None = None
+    status: Literal["conflict", "invalid"]
+    detail: str
+
+
+class UserImportReport(BaseChema):
+    created: int = 0
+    conflicts: int = 0
+    invalid: int = 0
+    rows: list[UserImportRowResult] = []
+
+
+class TokenIntrospectionRequest(BaseChema):
+    tokens: list[str] = Field(min_length=1, max_length=auth_settings.token_introspection_max_tokens)
+
+
+class TokenIntrospection(BaseChema):
+    """Introspection result of a token, after RFC 7662; only `active` is set for inactive tokens."""
+
+    active: bool
+    token_type: str | None = None
+    sub: str | None = None
+    username: str | None = None
+    email: str | None = None
+    jti: str | None = None
+    iat: int | None = None
+    exp: int | None = None
@@ -1,7 +1,31 @@
-from auth_service.auth.scemas import UserCreate, UserGet, UserGetWithPassword, UserUpdate
+from typing import Any, AsyncIterator, Sequence
+from uuid import UUID
+from sqlalchemy import Row
+from sqlalchemy.exc import NoResultFound
+
+from auth_service.auth.config import auth_settings
+from auth_service.auth.scemas import (
+    UserCreate,
+    UserGet,
+    UserGetWithPassword,
+    UserGetWithVersion,
+    UserImportReport,
+    UserUpdate,
+)
 from auth_service.auth.repository import UserRepository
 from auth_service.auth.exceptions import UserNotFound
-from auth_service.auth.utils import get_password_hash
+from auth_service.auth.bulk_import import UserImporter
+from auth_service.auth.pagination import CURSOR_SORT_COLUMNS, encode_cursor, decode_cursor
+from auth_service.auth.hashing import get_password_hash_async
+
+
+# Columns each user model is read from, so that lookups load no more than they return
+USER_COLUMNS: dict[type[UserGet], tuple[str, ...]] = {
+    model: tuple(model.model_fields) for model in (UserGet, UserGetWithVersion, UserGetWithPassword)
+}
+
+# Columns of the users in listings, which are sent as they are read instead of through UserGet
+USER_LISTING_COLUMNS: tuple[str, ...] = USER_COLUMNS[UserGet]
 
 
 class UserService:
@@ -11,38 +35,118 @@ class UserService:
     async def create_user(self, data: UserCreate) -> UserGet:
         """Create new user."""
         user_data = data.model_dump()
-        user_data["hashed_password"] = get_password_hash(user_data["password"])
+        user_data["hashed_password"] = await get_password_hash_async(user_data["password"])
         del user_data["password"]
 
         user = await self.repository.create(data=user_data)
         return UserGet.model_validate(user)
 
+    async def import_users(self, lines: AsyncIterator[str], import_format: str = "ndjson") -> UserImportReport:
+        """Create users from NDJSON or CSV lines in batches, reporting rows that were not created."""
+        return await UserImporter(self.repository).import_users(lines, import_format)
+
     async def get_user(
         self,
         include_password: bool = False,
+        include_version: bool = False,
         **filters,
-    ) -> UserGet | UserGetWithPassword:
+    ) -> UserGet | UserGetWithVersion | UserGetWithPassword:
         """Get user by filters (username, email or id)."""
-        user = await self.repository.get_single(**filters)
+        model: type[UserGet] = UserGet
+        if include_password:
+            model = UserGetWithPassword
+        elif include_version:
+            model = UserGetWithVersion
+
+        # Credentials and token versions decide authentication, so they are read from the primary
+        user = await self.repository.get_single(
+            columns=USER_COLUMNS[model],
+            replica=model is UserGet,
+            **filters,
+        )
 
         if not user:
             raise UserNotFound(f"User with filters {filters} not found")
+        return model.model_validate(user)
 
-        return UserGetWithPassword.model_validate(user) if include_password else UserGet.model_validate(user)
+    async def get_users_by(
+        self,
+        field: str,
+        values: Sequence[Any],
+        replica: bool = True,
+    ) -> dict[Any, UserGetWithVersion]:
+        """Get the users whose `field` (id, username or email) is one of `values`, keyed by that value.
+
+        Values without a user are left out.
+        """
+        users = await self.repository.get_many(
+            field,
+            list(dict.fromkeys(values)),
+            chunk_size=auth_settings.user_lookup_chunk_size,
+            columns=USER_COLUMNS[UserGetWithVersion],
+            replica=replica,
+        )
+        return {getattr(user, field): UserGetWithVersion.model_validate(user) for user in users}
+
+    async def is_token_version_current(self, id: UUID, token_version: int) -> bool:
+        """Check that the user still exists, is active and has not revoked tokens of this version."""
+        state = await self.repository.get_token_state(id=id)
+        if state is None:
+            return False
+
+        is_active, current_token_version = state
+        return is_active and current_token_version == token_version
 
     async def get_users(
         self,
         order: str = "id",
         offset: int = 0,
         limit: int = 100,
-    ) -> list[UserGet]:
-        """Get users with pagination."""
-        users = await self.repository.get_multiple(
+    ) -> list[Row[Any]]:
+        """Get users with pagination, as rows of `USER_LISTING_COLUMNS`."""
+        return await self.repository.get_multiple_rows(
+            columns=USER_LISTING_COLUMNS,
             order=order,
             offset=offset,
             limit=limit,
         )
-        return [UserGet.model_validate(user) for user in users]
+
+    async def get_users_page(
+        self,
+        order: str = "id",
+        cursor: str | None = None,
+        limit: int = 100,
+    ) -> tuple[list[Row[Any]], str | None]:
+        """Get users with keyset pagination, returning the page and the cursor of the next one.
+
+        Users are returned as rows of `USER_LISTING_COLUMNS`.
+        """
+        after = None
+        if cursor is not None:
+            order, last_value, last_id = decode_cursor(cursor)
+            after = (last_value, last_id)
+
+        page = await self.repository.get_multiple_rows_after(
+            columns=USER_LISTING_COLUMNS,
+            order=order,
+            after=after,
+            limit=limit,
+        )
+        return page, self.get_next_cursor(page, order=order, limit=limit)
+
+    @staticmethod
+    def get_next_cursor(page: Sequence[Any], order: str, limit: int) -> str | None:
+        """Get the cursor of the page following a full page of users sorted by `order`."""
+        if not page or len(page) < limit or order not in CURSOR_SORT_COLUMNS:
+            return None
+
+        last_user = page[-1]
+        return encode_cursor(order, getattr(last_user, order), last_user.id)
+
+    async def is_admin(self, id: UUID) -> bool:
+        """Check if the user with given id is an admin."""
+        user = await self.repository.get_single(columns=("is_admin",), replica=False, id=id)
+        return user is not None and user.is_admin
 
     async def update_user(
         self,
@@ -54,6 +158,27 @@ class UserService:
         user = await self.repository.update(data=update_data, **filters)
         return UserGet.model_validate(user)
 
+    async def rehash_password(self, user_id: UUID, password: str, hashed_password: str) -> bool:
+        """Replace an outdated password hash, unless the password was changed meanwhile."""
+        new_hashed_password = await get_password_hash_async(password)
+        try:
+            await self.repository.update(
+                data={"hashed_password": new_hashed_password},
+                id=user_id,
+                hashed_password=hashed_password,
+            )
+        except NoResultFound:
+            return False
+        return True
+
+    async def revoke_tokens(self, **filters) -> int:
+        """Invalidate all access tokens issued to user found by filters (username, email or id).
+
+        Returns the new token version of the user.
+        """
+        user = await self.repository.increment_token_version(**filters)
+        return user.token_version
+
     async def delete_user(self, **filters) -> None:
         """Delete user by filters (username, email or id)."""
         await self.repository.delete(**filters)
@@ -0,0 +1,148 @@
+import hashlib
+import sys
+import time
+from collections import OrderedDict
+from typing import Any
+
+from auth_service.auth.config import auth_settings
+from auth_service.auth.keys import key_manager
+from auth_service.auth.codec import token_codec
+from auth_service.auth.utils import ACCESS_TOKEN_TYPE, TOKEN_TYPE_FIELD, decode_jwt
+
+
+class TokenCache:
+    """LRU cache of verified token payloads keyed by the token's SHA-256 digest.
+
+    Entries expire at the token's `exp` claim and the cache is bounded both by
+    the number of entries and by the approximate size of the cached payloads.
+    """
+
+    def __init__(self, max_entries: int = 10_000, max_bytes: int = 16 * 1024 * 1024) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.key_generation = key_manager.generation
+        self._entries: OrderedDict[bytes, tuple[float, dict[str, Any], int]] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    @staticmethod
+    def _payload_size(key: bytes, payload: dict[str, Any]) -> int:
+        return (
+            sys.getsizeof(key)
+            + sys.getsizeof(payload)
+            + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in payload.items())
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str) -> dict[str, Any] | None:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, payload, _ = entry
+        if expires_at <= time.time():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return payload.copy()
+
+    def set(self, token: str, payload: dict[str, Any]) -> None:
+        expires_at = payload.get("exp")
+        if expires_at is None or self.max_entries <= 0:
+            return
+
+        key = self._key(token)
+        size = self._payload_size(key, payload)
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (float(expires_at), payload.copy(), size)
+        self.size_bytes += size
+
+        while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: bytes) -> None:
+        _, _, size = self._entries.pop(key)
+        self.size_bytes -= size
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+token_cache = TokenCache(
+    max_entries=auth_settings.token_cache_max_entries,
+    max_bytes=auth_settings.token_cache_max_bytes,
+)
+
+
+def _drop_removed_keys() -> None:
+    # Cache hits do not verify signatures, so key files are polled here too
+    key_manager.reload_if_changed()
+    if token_cache.key_generation != key_manager.generation:
+        # Tokens signed with a removed key must not be served from the cache
+        token_cache.clear()
+        token_cache.key_generation = key_manager.generation
+
+
+def _cache_access_token(token: str, payload: dict[str, Any]) -> None:
+    # Refresh tokens are used once, so caching them would only push out access tokens
+    if payload.get(TOKEN_TYPE_FIELD) == ACCESS_TOKEN_TYPE:
+        token_cache.set(token, payload)
+
+
+def decode_jwt_cached(token: str) -> dict[str, Any]:
+    """Decode a token, verifying an access token's signature only on the first call per worker."""
+    if not auth_settings.token_cache_enabled:
+        return decode_jwt(token)
+
+    _drop_removed_keys()
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = decode_jwt(token)
+        _cache_access_token(token, payload)
+    return payload
+
+
+def decode_jwt_many_cached(tokens: list[str]) -> list[dict[str, Any] | None]:
+    """Decode many tokens, verifying the ones missing from the cache in one batch.
+
+    Invalid tokens give `None` in their position.
+    """
+    if not auth_settings.token_cache_enabled:
+        return token_codec.decode_many(tokens)
+
+    _drop_removed_keys()
+    payloads = [token_cache.get(token) for token in tokens]
+    missing = [index for index, payload in enumerate(payloads) if payload is None]
+    for index, payload in zip(missing, token_codec.decode_many([tokens[index] for index in missing])):
+        if payload is not None:
+            _cache_access_token(tokens[index], payload)
+        payloads[index] = payload
+    return payloads
@@ -0,0 +1,188 @@
+import json
+from typing import Any, Sequence
+from uuid import UUID
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth_service.cache import CacheBackend, LRUCache, get_cache_backend
+from auth_service.auth.config import auth_settings
+from auth_service.auth.models import User
+from auth_service.auth.repository import UserRepository
+from auth_service.auth.loader import UserLoader
+
+
+USER_CACHE_FIELDS: tuple[str, ...] = ("id", "username", "email")
+# Profile and token state only: credentials and admin rights are always read from the database
+USER_CACHE_COLUMNS: tuple[str, ...] = (
+    "id",
+    "username",
+    "email",
+    "is_active",
+    "token_version",
+)
+
+
+class UserCache:
+    """Two-tier cache of user rows addressable by id, username or email.
+
+    Rows are stored under their id; username and email keys only point to the
+    id, so invalidating a user only needs the id key to be dropped. Pointers
+    that outlive their row are detected by comparing the looked up value with
+    the row itself.
+
+    Invalidating a user also leaves a marker for `fill_guard` seconds, during
+    which fills of that user are skipped: a fill that read the row before the
+    update cannot put the old row back. The check and the write of a fill are
+    not atomic, so a fill can still race an invalidation landing between them.
+    Other workers keep their local entry until it expires after `local_ttl`.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        ttl: float = 60.0,
+        local_ttl: float = 5.0,
+        fill_guard: float = 5.0,
+        backend: CacheBackend | None = None,
+    ) -> None:
+        self.ttl = ttl
+        self.fill_guard = fill_guard
+        self.local = LRUCache(max_entries=max_entries, ttl=local_ttl)
+        self.invalidated = LRUCache(max_entries=max_entries, ttl=fill_guard)
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.skipped_fills = 0
+
+    @staticmethod
+    def _key(field: str, value: Any) -> str:
+        return f"user:{field}:{value}"
+
+    async def _get(self, key: str) -> Any | None:
+        value = self.local.get(key)
+        if value is None and self.backend is not None:
+            raw_value = await self.backend.get(key)
+            if raw_value is not None:
+                value = json.loads(raw_value)
+                self.local.set(key, value)
+        return value
+
+    async def _set(self, key: str, value: Any) -> None:
+        self.local.set(key, value)
+        if self.backend is not None:
+            await self.backend.set(key, json.dumps(value).encode("utf-8"), self.ttl)
+
+    async def get(self, field: str, value: Any) -> dict[str, Any] | None:
+        user_id = str(value) if field == "id" else await self._get(self._key(field, value))
+        record = await self._get(self._key("id", user_id)) if user_id is not None else None
+
+        if record is None or record[field] != str(value):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return record
+
+    async def _is_invalidated(self, user_id: str) -> bool:
+        key = self._key("invalidated", user_id)
+        if self.invalidated.get(key) is not None:
+            return True
+        return self.backend is not None and await self.backend.get(key) is not None
+
+    async def set(self, user: User | Row[Any]) -> None:
+        record = {column: getattr(user, column) for column in USER_CACHE_COLUMNS}
+        record["id"] = str(record["id"])
+        if await self._is_invalidated(record["id"]):
+            self.skipped_fills += 1
+            return
+
+        await self._set(self._key("id", record["id"]), record)
+        for field in USER_CACHE_FIELDS[1:]:
+            await self._set(self._key(field, record[field]), record["id"])
+
+    async def invalidate(self, *ids: UUID | str) -> None:
+        keys = [self._key("id", user_id) for user_id in ids]
+        self.local.delete(*keys)
+        for user_id in ids:
+            self.invalidated.set(self._key("invalidated", user_id), True)
+        if self.backend is not None:
+            await self.backend.delete(*keys)
+            for user_id in ids:
+                await self.backend.set(self._key("invalidated", user_id), b"1", self.fill_guard)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self.local),
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped_fills": self.skipped_fills,
+        }
+
+
+class CachedUserRepository(UserRepository):
+    """User repository that serves single-row lookups from `UserCache`."""
+
+    def __init__(self, async_session: AsyncSession, cache: UserCache, loader: UserLoader | None = None) -> None:
+        super().__init__(async_session, loader)
+        self.cache = cache
+
+    async def get_single(
+        self,
+        columns: Sequence[str] | None = None,
+        replica: bool = True,
+        **filters,
+    ) -> User | Row[Any] | None:
+        if (
+            len(filters) != 1
+            or next(iter(filters)) not in USER_CACHE_FIELDS
+            or columns is None
+            or not set(columns) <= set(USER_CACHE_COLUMNS)
+        ):
+            return await super().get_single(columns, replica, **filters)
+
+        field, value = next(iter(filters.items()))
+        record = await self.cache.get(field, value)
+        if record is not None:
+            return User(**{**record, "id": UUID(record["id"])})
+
+        # All cached columns are loaded on a miss, since the record serves every projection of them.
+        # A replica may serve the fill: rows it read before an update are kept out by the fill guard
+        user = await super().get_single(USER_CACHE_COLUMNS, replica, **filters)
+        if user is not None:
+            await self.cache.set(user)
+        return user
+
+    async def get_token_state(
+        self,
+        id: UUID,
+    ) -> tuple[bool, int] | None:
+        record = await self.cache.get("id", id)
+        if record is not None:
+            return record["is_active"], record["token_version"]
+        return await super().get_token_state(id=id)
+
+    async def update(
+        self,
+        data: dict[str, Any],
+        **filters,
+    ) -> User:
+        user = await super().update(data=data, **filters)
+        await self.cache.invalidate(user.id)
+        return user
+
+    async def delete(
+        self,
+        **filters,
+    ) -> list[UUID]:
+        ids = await super().delete(**filters)
+        await self.cache.invalidate(*ids)
+        return ids
+
+
+user_cache = UserCache(
+    max_entries=auth_settings.user_cache_max_entries,
+    ttl=auth_settings.user_cache_ttl_seconds,
+    local_ttl=auth_settings.user_cache_local_ttl_seconds,
+    fill_guard=auth_settings.user_cache_fill_guard_seconds,
+    backend=get_cache_backend(),
+)
@@ -1,57 +1,68 @@
 from typing import Any
-import datetime
-import bcrypt
+from uuid import UUID, uuid4
+import time
 import jwt
 
+from auth_service.metrics import time_stage
 from auth_service.auth.config import auth_settings
-from auth_service.auth.scemas import UserGet
+from auth_service.auth.codec import token_codec
+from auth_service.auth.password_policy import password_policy
+from auth_service.auth.scemas import UserGet, UserGetWithVersion
 
 
 TOKEN_TYPE_FIELD: str = "type"
+TOKEN_VERSION_FIELD: str = "ver"
 ACCESS_TOKEN_TYPE: str = "access"
 REFRESH_TOKEN_TYPE: str = "refresh"
 
 
 def get_password_hash(password: str) -> str:
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+    return password_policy.hash(password)
 
 
 def validate_password(password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(password.encode("utf-8"), hashed_password.encode("utf-8"))
+    return password_policy.verify(password, hashed_password)
 
 
 def encode_jwt(
     payload: dict[str, Any],
-    private_key: str = auth_settings.private_key_path.read_text(),
-    algorithm: str = auth_settings.algorithm,
+    private_key: str | None = None,
+    algorithm: str | None = None,
     expire_minutes: int = auth_settings.access_token_expire_minutes,
 ) -> str:
+    """Sign the payload with the given key, or with the current signing key."""
     to_encode = payload.copy()
-    now = datetime.datetime.now(datetime.UTC)
+    now = int(time.time())
 
     to_encode.update(
         iat=now,
-        exp=now + datetime.timedelta(minutes=expire_minutes),
+        exp=now + expire_minutes * 60,
     )
 
-    return jwt.encode(
-        to_encode,
-        private_key,
-        algorithm=algorithm,
-    )
+    with time_stage("jwt_sign"):
+        if private_key is not None:
+            return jwt.encode(
+                to_encode,
+                private_key,
+                algorithm=algorithm or auth_settings.algorithm,
+            )
+        return token_codec.encode(to_encode)
 
 
 def decode_jwt(
     token: str,
-    public_key: str = auth_settings.public_key_path.read_text(),
-    algorithm: str = auth_settings.algorithm,
+    public_key: str | None = None,
+    algorithm: str | None = None,
 ) -> dict[str, Any]:
-    return jwt.decode(
-        token,
-        public_key,
-        algorithms=[algorithm],
-    )
+    """Verify the token with the given key, or with the known key its `kid` header names."""
+    with time_stage("jwt_verify"):
+        if public_key is not None:
+            return jwt.decode(
+                token,
+                public_key,
+                algorithms=[algorithm or auth_settings.algorithm],
+            )
+        return token_codec.decode(token)
 
 
 def create_token(
@@ -69,11 +80,14 @@ def create_token(
     )
 
 
-def create_access_token(user: UserGet) -> str:
+def create_access_token(user: UserGetWithVersion) -> str:
     payload = {
         "sub": str(user.id),
         "username": user.username,
         "email": user.email,
+        "is_active": user.is_active,
+        "jti": str(uuid4()),
+        TOKEN_VERSION_FIELD: user.token_version,
     }
 
     return create_token(
@@ -83,9 +97,10 @@ def create_access_token(user: UserGet) -> str:
     )
 
 
-def create_refresh_token(user: UserGet) -> str:
+def create_refresh_token(user: UserGet, jti: UUID) -> str:
     payload = {
         "sub": str(user.id),
+        "jti": str(jti),
     }
 
     return create_token(
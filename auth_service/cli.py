@@ -0,0 +1,63 @@
+"""Management commands.
+
+    python -m auth_service.cli import-users users.ndjson
+    python -m auth_service.cli import-users users.csv --format csv --batch-size 5000
+"""
+import argparse
+import asyncio
+from pathlib import Path
+from typing import AsyncIterator
+
+from auth_service.database import async_session_maker
+from auth_service.auth.config import auth_settings
+from auth_service.auth.bulk_import import IMPORT_FORMATS, UserImporter
+from auth_service.auth.hashing import PasswordHasher
+from auth_service.auth.password_policy import password_policy
+from auth_service.auth.repository import UserRepository
+
+
+async def read_lines(path: Path) -> AsyncIterator[str]:
+    with path.open(encoding="utf-8") as file:
+        for line in file:
+            yield line.rstrip("\r\n")
+
+
+async def import_users(path: Path, import_format: str, batch_size: int) -> None:
+    if auth_settings.password_hash_target_ms is not None:
+        password_policy.calibrate(auth_settings.password_hash_target_ms)
+
+    hasher = PasswordHasher(
+        executor_type="process",
+        max_workers=auth_settings.bulk_import_hasher_max_workers,
+        max_pending=batch_size,
+    )
+    try:
+        async with async_session_maker() as session:
+            importer = UserImporter(
+                UserRepository(session),
+                hasher=hasher,
+                batch_size=batch_size,
+            )
+            report = await importer.import_users(read_lines(path), import_format)
+    finally:
+        hasher.shutdown()
+
+    print(report.model_dump_json(indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import-users", help="Create users from an NDJSON or CSV file")
+    import_parser.add_argument("path", type=Path)
+    import_parser.add_argument("--format", choices=IMPORT_FORMATS, default="ndjson")
+    import_parser.add_argument("--batch-size", type=int, default=auth_settings.bulk_import_batch_size)
+
+    args = parser.parse_args()
+    if args.command == "import-users":
+        asyncio.run(import_users(args.path, args.format, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,48 @@ class DBSettings(BaseModel):
     db_url: str = f"postgresql+asyncpg://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
     echo: bool = False
 
+    pool_size: int = int(os.environ.get("DB_POOL_SIZE", 5))
+    max_overflow: int = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+    pool_timeout: float = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+    pool_recycle: int = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+    pool_pre_ping: bool = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+
+    # SQLAlchemy compiled statements and asyncpg prepared statements per connection
+    query_cache_size: int = int(os.environ.get("DB_QUERY_CACHE_SIZE", 500))
+    prepared_statement_cache_size: int = int(os.environ.get("DB_PREPARED_STATEMENT_CACHE_SIZE", 100))
+
+    # Comma-separated URLs of read replicas; reads fall back to the primary when every
+    # replica is unreachable or lags behind it by more than the limit
+    replica_urls: list[str] = [url.strip() for url in os.environ.get("DB_REPLICA_URLS", "").split(",") if url.strip()]
+    replica_max_lag_seconds: float = float(os.environ.get("DB_REPLICA_MAX_LAG_SECONDS", 2))
+    replica_check_interval_seconds: float = float(os.environ.get("DB_REPLICA_CHECK_INTERVAL_SECONDS", 1))
+
+
+class CacheSettings(BaseModel):
+    redis_url: str | None = os.environ.get("REDIS_URL")
+
+
+class MetricsSettings(BaseModel):
+    # Served at /metrics; request and stage timers cost a few microseconds per request
+    enabled: bool = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+
+
+class JobQueueSettings(BaseModel):
+    # Durable jobs are kept in memory ("memory") or in a local SQLite file ("sqlite")
+    store: str = os.environ.get("JOB_QUEUE_STORE", "memory")
+    sqlite_path: str = os.environ.get("JOB_QUEUE_SQLITE_PATH", "jobs.sqlite3")
+
+    concurrency: int = int(os.environ.get("JOB_QUEUE_CONCURRENCY", 4))
+    batch_size: int = int(os.environ.get("JOB_QUEUE_BATCH_SIZE", 100))
+    # Jobs enqueued within the window are stored together and merged by key
+    batch_window_seconds: float = float(os.environ.get("JOB_QUEUE_BATCH_WINDOW_SECONDS", 0.05))
+    poll_interval_seconds: float = float(os.environ.get("JOB_QUEUE_POLL_INTERVAL_SECONDS", 1))
+
+    max_attempts: int = int(os.environ.get("JOB_QUEUE_MAX_ATTEMPTS", 5))
+    retry_base_seconds: float = float(os.environ.get("JOB_QUEUE_RETRY_BASE_SECONDS", 1))
+    lease_seconds: float = float(os.environ.get("JOB_QUEUE_LEASE_SECONDS", 60))
+    shutdown_timeout_seconds: float = float(os.environ.get("JOB_QUEUE_SHUTDOWN_TIMEOUT_SECONDS", 10))
+
 
 class Settings(BaseSettings):
     project_title: str
@@ -21,6 +63,9 @@ class Settings(BaseSettings):
     description: str
 
     db_settings: DBSettings = DBSettings()
+    cache_settings: CacheSettings = CacheSettings()
+    metrics_settings: MetricsSettings = MetricsSettings()
+    job_queue_settings: JobQueueSettings = JobQueueSettings()
 
 
 settings = Settings(
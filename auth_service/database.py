@@ -1,17 +1,209 @@
-from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, AsyncGenerator
+from sqlalchemy import Connection, Engine, event, exc, text
+from sqlalchemy.engine import ExecutionContext
+from sqlalchemy.engine.default import CACHE_HIT
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
 
 from auth_service.config import settings
+from auth_service.metrics import observe_stage
 
 
-async_engine = create_async_engine(
-    url=settings.db_settings.db_url,
-    echo=settings.db_settings.echo,
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.checkout_wait_seconds = 0.0
+        self.checkout_wait_max_seconds = 0.0
+        self.checkout_timeouts = 0
+
+    def observe_checkout(self, wait_seconds: float) -> None:
+        self.checkouts += 1
+        self.checkout_wait_seconds += wait_seconds
+        self.checkout_wait_max_seconds = max(self.checkout_wait_max_seconds, wait_seconds)
+
+
+pool_metrics = PoolMetrics()
+
+
+class QueryCacheMetrics:
+    """Counts executions whose compiled statement was found in SQLAlchemy's query cache."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, float]:
+        executions = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / executions if executions else 0.0,
+        }
+
+
+query_cache_metrics = QueryCacheMetrics()
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a free connection."""
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.checkout_timeouts += 1
+            raise
+
+        wait_seconds = time.perf_counter() - started
+        pool_metrics.observe_checkout(wait_seconds)
+        observe_stage("db_pool_checkout", wait_seconds)
+        return connection
+
+
+def _start_query_timer(conn: Connection, *args: Any) -> None:
+    conn.info["query_started"] = time.perf_counter()
+
+
+def _observe_query(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: ExecutionContext | None,
+    executemany: bool,
+) -> None:
+    started = conn.info.pop("query_started", None)
+    if started is not None:
+        observe_stage("db_query", time.perf_counter() - started)
+
+    if context is not None:
+        if getattr(context, "cache_hit", None) is CACHE_HIT:
+            query_cache_metrics.hits += 1
+        else:
+            query_cache_metrics.misses += 1
+
+
+def create_engine(url: str) -> AsyncEngine:
+    engine = create_async_engine(
+        url=url,
+        echo=settings.db_settings.echo,
+        poolclass=InstrumentedAsyncPool,
+        pool_size=settings.db_settings.pool_size,
+        max_overflow=settings.db_settings.max_overflow,
+        pool_timeout=settings.db_settings.pool_timeout,
+        pool_recycle=settings.db_settings.pool_recycle,
+        pool_pre_ping=settings.db_settings.pool_pre_ping,
+        query_cache_size=settings.db_settings.query_cache_size,
+        connect_args={
+            "prepared_statement_cache_size": settings.db_settings.prepared_statement_cache_size,
+        },
+    )
+    event.listen(engine.sync_engine, "before_cursor_execute", _start_query_timer)
+    event.listen(engine.sync_engine, "after_cursor_execute", _observe_query)
+    return engine
+
+
+async_engine = create_engine(settings.db_settings.db_url)
+
+
+# Seconds since the last replayed transaction, or 0 if the replica has replayed everything it received
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
 )
 
+
+class ReplicaRouter:
+    """Picks the read replica for a query, round robin among the replicas that keep up.
+
+    Replicas count as available once a lag check has found them within
+    `max_lag_seconds` of the primary; unreachable ones are skipped until they
+    recover. Without an available replica, reads go to the primary.
+    """
+
+    def __init__(self, urls: list[str], max_lag_seconds: float) -> None:
+        self.engines = [create_engine(url) for url in urls]
+        self.max_lag_seconds = max_lag_seconds
+        self.lag_seconds: list[float | None] = [None] * len(self.engines)
+        self._available: list[AsyncEngine] = []
+        self._next = itertools.count()
+        self.replica_reads = 0
+        self.fallback_reads = 0
+
+    def choose(self) -> AsyncEngine | None:
+        if not self._available:
+            self.fallback_reads += 1
+            return None
+
+        self.replica_reads += 1
+        return self._available[next(self._next) % len(self._available)]
+
+    async def _check_lag(self, engine: AsyncEngine) -> float | None:
+        try:
+            async with engine.connect() as connection:
+                return float((await connection.execute(REPLICA_LAG_QUERY)).scalar_one())
+        except Exception:
+            logger.exception("Failed to check the lag of replica %s", engine.url.render_as_string())
+            return None
+
+    async def check(self) -> None:
+        self.lag_seconds = list(await asyncio.gather(*(self._check_lag(engine) for engine in self.engines)))
+        self._available = [
+            engine
+            for engine, lag_seconds in zip(self.engines, self.lag_seconds)
+            if lag_seconds is not None and lag_seconds <= self.max_lag_seconds
+        ]
+
+    async def check_periodically(self, interval: float) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict[str, float]:
+        lags = [lag_seconds for lag_seconds in self.lag_seconds if lag_seconds is not None]
+        return {
+            "replicas": len(self.engines),
+            "available": len(self._available),
+            "lag_max_seconds": max(lags, default=0.0),
+            "replica_reads": self.replica_reads,
+            "fallback_reads": self.fallback_reads,
+        }
+
+
+replica_router = ReplicaRouter(settings.db_settings.replica_urls, settings.db_settings.replica_max_lag_seconds)
+
+
+class RoutingSession(Session):
+    """Session that sends reads executed with `bind_arguments={"replica": True}` to a replica.
+
+    Everything else goes to the primary. Once the session has written, its
+    reads stay on the primary too, so that it always sees its own writes.
+    """
+
+    def get_bind(self, mapper: Any = None, *, clause: Any = None, replica: bool = False, **kw: Any) -> Engine:
+        if self._flushing or (clause is not None and clause.is_dml):
+            self.info["has_written"] = True
+        elif replica and not self.info.get("has_written"):
+            engine = replica_router.choose()
+            if engine is not None:
+                return engine.sync_engine
+
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
 async_session_maker = async_sessionmaker(
     bind=async_engine,
     class_=AsyncSession,
+    sync_session_class=RoutingSession,
     autoflush=False,
     autocommit=False,
     expire_on_commit=False,
@@ -21,3 +213,20 @@ async_session_maker = async_sessionmaker(
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
         yield session
+
+
+def get_pool_stats() -> dict[str, float]:
+    pool = async_engine.sync_engine.pool
+    capacity = settings.db_settings.pool_size + settings.db_settings.max_overflow
+    checked_out = pool.checkedout()  # type: ignore
+
+    return {
+        "size": pool.size(),  # type: ignore
+        "checked_out": checked_out,
+        "overflow": pool.overflow(),  # type: ignore
+        "utilization": checked_out / capacity if capacity else 0.0,
+        "checkouts": pool_metrics.checkouts,
+        "checkout_wait_seconds": pool_metrics.checkout_wait_seconds,
+        "checkout_wait_max_seconds": pool_metrics.checkout_wait_max_seconds,
+        "checkout_timeouts": pool_metrics.checkout_timeouts,
+    }
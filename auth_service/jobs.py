@@ -0,0 +1,400 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable
+
+from auth_service.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[list[dict[str, Any]]], Awaitable[None]]
+
+
+class Job:
+    """A unit of work of a registered `kind`; due at `run_at` (epoch seconds).
+
+    Adding a job with a `key` replaces the pending job of its kind with the same key.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        payload: dict[str, Any],
+        id: str | None = None,
+        attempts: int = 0,
+        run_at: float = 0.0,
+        key: str | None = None,
+    ) -> None:
+        self.kind = kind
+        self.payload = payload
+        self.id = id or uuid.uuid4().hex
+        self.attempts = attempts
+        self.run_at = run_at
+        self.key = key
+
+
+class JobStore(ABC):
+    """Pending jobs. Taken jobs are leased: unless they are completed or retried
+    before the lease ends, for instance because the worker died, they are taken again.
+    """
+
+    @abstractmethod
+    async def add(self, jobs: list[Job]) -> int:
+        """Add jobs, replacing pending jobs with the same kind and key; return how many were replaced.
+
+        Jobs that are leased are not replaced, since they may already be running.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def take(self, kind: str, limit: int, lease_seconds: float) -> list[Job]:
+        """Lease up to `limit` due jobs of `kind`, oldest first."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def complete(self, ids: list[str]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def retry(self, job: Job, run_at: float) -> None:
+        """Release the job to be taken again at `run_at`, with its attempts updated."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def count(self) -> int:
+        raise NotImplementedError
+
+
+class InMemoryJobStore(JobStore):
+    """Per-worker store; jobs pending at shutdown are lost."""
+
+    def __init__(self) -> None:
+        self._jobs: dict[str, Job] = {}
+        self._leased_until: dict[str, float] = {}
+        # Id of the latest job per kind and key
+        self._keys: dict[tuple[str, str], str] = {}
+
+    async def add(self, jobs: list[Job]) -> int:
+        now = time.time()
+        replaced = 0
+        for job in jobs:
+            if job.key is not None:
+                pending_id = self._keys.get((job.kind, job.key))
+                if pending_id in self._jobs and self._leased_until.get(pending_id, 0.0) <= now:  # type: ignore
+                    del self._jobs[pending_id]  # type: ignore
+                    replaced += 1
+                self._keys[(job.kind, job.key)] = job.id
+            self._jobs[job.id] = job
+        return replaced
+
+    async def take(self, kind: str, limit: int, lease_seconds: float) -> list[Job]:
+        now = time.time()
+        jobs = []
+        for job in self._jobs.values():
+            if len(jobs) >= limit:
+                break
+            if job.kind == kind and job.run_at <= now and self._leased_until.get(job.id, 0.0) <= now:
+                self._leased_until[job.id] = now + lease_seconds
+                jobs.append(job)
+        return jobs
+
+    async def complete(self, ids: list[str]) -> None:
+        for id in ids:
+            job = self._jobs.pop(id, None)
+            self._leased_until.pop(id, None)
+            if job is not None and job.key is not None and self._keys.get((job.kind, job.key)) == id:
+                del self._keys[(job.kind, job.key)]
+
+    async def retry(self, job: Job, run_at: float) -> None:
+        job.run_at = run_at
+        self._leased_until.pop(job.id, None)
+
+    async def count(self) -> int:
+        return len(self._jobs)
+
+
+class SQLiteJobStore(JobStore):
+    """Durable store in a local SQLite file, shared by the workers of one host."""
+
+    def __init__(self, path: str) -> None:
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL, run_at REAL NOT NULL, leased_until REAL NOT NULL DEFAULT 0, key TEXT)"
+            )
+            columns = {row[1] for row in self._connection.execute("PRAGMA table_info(jobs)")}
+            if "key" not in columns:
+                # Stores created before jobs had keys
+                self._connection.execute("ALTER TABLE jobs ADD COLUMN key TEXT")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS ix_jobs_kind_run_at ON jobs (kind, run_at)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS ix_jobs_kind_key ON jobs (kind, key)")
+
+    def _execute(self, operation: Callable[[sqlite3.Connection], Any]) -> Awaitable[Any]:
+        def run() -> Any:
+            with self._lock:
+                self._connection.execute("BEGIN IMMEDIATE")
+                try:
+                    result = operation(self._connection)
+                except BaseException:
+                    self._connection.execute("ROLLBACK")
+                    raise
+                self._connection.execute("COMMIT")
+                return result
+
+        return asyncio.to_thread(run)
+
+    async def add(self, jobs: list[Job]) -> int:
+        def add(connection: sqlite3.Connection) -> int:
+            now = time.time()
+            replaced = 0
+            for job in jobs:
+                if job.key is not None:
+                    replaced += connection.execute(
+                        "DELETE FROM jobs WHERE kind = ? AND key = ? AND leased_until <= ?",
+                        (job.kind, job.key, now),
+                    ).rowcount
+            connection.executemany(
+                "INSERT INTO jobs (id, kind, payload, attempts, run_at, key) VALUES (?, ?, ?, ?, ?, ?)",
+                [(job.id, job.kind, json.dumps(job.payload), job.attempts, job.run_at, job.key) for job in jobs],
+            )
+            return replaced
+
+        return await self._execute(add)
+
+    async def take(self, kind: str, limit: int, lease_seconds: float) -> list[Job]:
+        def take(connection: sqlite3.Connection) -> list[Job]:
+            now = time.time()
+            rows = connection.execute(
+                "SELECT id, payload, attempts, run_at, key FROM jobs "
+                "WHERE kind = ? AND run_at <= ? AND leased_until <= ? ORDER BY run_at LIMIT ?",
+                (kind, now, now, limit),
+            ).fetchall()
+            connection.executemany(
+                "UPDATE jobs SET leased_until = ? WHERE id = ?",
+                [(now + lease_seconds, id) for id, *_ in rows],
+            )
+            return [
+                Job(kind, json.loads(payload), id, attempts, run_at, key)
+                for id, payload, attempts, run_at, key in rows
+            ]
+
+        return await self._execute(take)
+
+    async def complete(self, ids: list[str]) -> None:
+        await self._execute(
+            lambda connection: connection.executemany("DELETE FROM jobs WHERE id = ?", [(id,) for id in ids])
+        )
+
+    async def retry(self, job: Job, run_at: float) -> None:
+        await self._execute(
+            lambda connection: connection.execute(
+                "UPDATE jobs SET attempts = ?, run_at = ?, leased_until = 0 WHERE id = ?",
+                (job.attempts, run_at, job.id),
+            )
+        )
+
+    async def count(self) -> int:
+        return await self._execute(lambda connection: connection.execute("SELECT COUNT(*) FROM jobs").fetchone()[0])
+
+
+def get_job_store() -> JobStore:
+    if settings.job_queue_settings.store == "sqlite":
+        return SQLiteJobStore(settings.job_queue_settings.sqlite_path)
+    return InMemoryJobStore()
+
+
+class JobQueue:
+    """In-process queue for side effects that need not delay the response.
+
+    Jobs enqueued within `batch_window` seconds are written to the store at
+    once. Of the jobs with the same key, only the last one is kept, both among
+    those enqueued together and among those pending in the store.
+    `concurrency` workers take batches of up to `batch_size` jobs of a kind and
+    pass their payloads to the kind's handler; failed batches are retried with
+    exponential backoff until `max_attempts`.
+
+    Jobs enqueued with `durable=False` are kept in memory only, so that
+    payloads such as plaintext passwords never reach the store; on shutdown the
+    workers finish them before stopping, waiting out their retries. Durable jobs
+    still pending then are taken up on the next start.
+
+    The durable store is created by `store_factory` when the queue starts, so
+    that importing the queue opens no files or connections.
+    """
+
+    def __init__(
+        self,
+        store_factory: Callable[[], JobStore] = get_job_store,
+        concurrency: int = settings.job_queue_settings.concurrency,
+        batch_size: int = settings.job_queue_settings.batch_size,
+        batch_window: float = settings.job_queue_settings.batch_window_seconds,
+        poll_interval: float = settings.job_queue_settings.poll_interval_seconds,
+        max_attempts: int = settings.job_queue_settings.max_attempts,
+        retry_base_seconds: float = settings.job_queue_settings.retry_base_seconds,
+        lease_seconds: float = settings.job_queue_settings.lease_seconds,
+    ) -> None:
+        self.store_factory = store_factory
+        self.store: JobStore | None = None
+        self.memory_store = InMemoryJobStore()
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.lease_seconds = lease_seconds
+        self.handlers: dict[str, JobHandler] = {}
+
+        self.enqueued = 0
+        self.coalesced = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self._buffer: dict[tuple[str, str, bool], Job] = {}
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._flushes: set[asyncio.Task[None]] = set()
+        self._wakeup: asyncio.Event | None = None
+        self._workers: list[asyncio.Task[None]] = []
+        self._stopping = False
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self.handlers[kind] = handler
+
+    def enqueue(self, kind: str, payload: dict[str, Any], key: str | None = None, durable: bool = True) -> None:
+        """Queue a job of a registered kind; a pending job of the kind with the same `key` is replaced."""
+        if kind not in self.handlers:
+            raise ValueError(f"No handler is registered for jobs of kind {kind!r}")
+
+        job = Job(kind, payload, key=key)
+        buffer_key = (kind, key or job.id, durable)
+        if buffer_key in self._buffer:
+            self.coalesced += 1
+        self._buffer[buffer_key] = job
+        self.enqueued += 1
+
+        if len(self._buffer) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._buffer:
+            return
+
+        jobs, self._buffer = self._buffer, {}
+        task = asyncio.create_task(self._add(jobs))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _add(self, jobs: dict[tuple[str, str, bool], Job]) -> None:
+        durable_jobs = [job for (_, _, durable), job in jobs.items() if durable]
+        self.coalesced += await self.memory_store.add([job for (_, _, durable), job in jobs.items() if not durable])
+        if durable_jobs:
+            try:
+                if self.store is None:
+                    raise RuntimeError("The job queue is not started")
+                self.coalesced += await self.store.add(durable_jobs)
+            except Exception:
+                self.dropped += len(durable_jobs)
+                logger.exception("Failed to store %d jobs", len(durable_jobs))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run_batch(self, store: JobStore, kind: str) -> bool:
+        """Run one batch of due jobs of `kind` from `store`; return whether there was one."""
+        jobs = await store.take(kind, self.batch_size, self.lease_seconds)
+        if not jobs:
+            return False
+
+        try:
+            await self.handlers[kind]([job.payload for job in jobs])
+        except Exception:
+            logger.exception("Failed to run %d jobs of kind %s", len(jobs), kind)
+            for job in jobs:
+                job.attempts += 1
+                if job.attempts >= self.max_attempts:
+                    self.dropped += 1
+                    await store.complete([job.id])
+                else:
+                    self.failed += 1
+                    await store.retry(job, time.time() + self.retry_base_seconds * 2 ** (job.attempts - 1))
+        else:
+            self.completed += len(jobs)
+            await store.complete([job.id for job in jobs])
+        return True
+
+    async def _work(self) -> None:
+        assert self._wakeup is not None and self.store is not None
+        while True:
+            # Cleared before looking for jobs, so that jobs added meanwhile wake the worker up again
+            self._wakeup.clear()
+            stores = (self.memory_store,) if self._stopping else (self.memory_store, self.store)
+            ran = False
+            for store in stores:
+                for kind in self.handlers:
+                    try:
+                        ran = await self._run_batch(store, kind) or ran
+                    except Exception:
+                        logger.exception("Failed to take jobs of kind %s", kind)
+
+            if not ran:
+                # In-memory jobs waiting for a retry would be lost, so they are waited for
+                if self._stopping and not await self.memory_store.count():
+                    return
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self) -> None:
+        if self.store is None:
+            self.store = self.store_factory()
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self, timeout: float = settings.job_queue_settings.shutdown_timeout_seconds) -> None:
+        """Store the buffered jobs, finish the in-memory ones and stop the workers.
+
+        Workers still busy after `timeout` seconds are cancelled; the durable jobs
+        they had taken are leased and run again after a restart.
+        """
+        self._flush()
+        if self._flushes:
+            await asyncio.wait(self._flushes)
+
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._workers:
+            _, pending = await asyncio.wait(self._workers, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "completed": self.completed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "buffered": len(self._buffer),
+        }
+
+
+job_queue = JobQueue()
@@ -1,7 +1,51 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncGenerator
 from fastapi import FastAPI
 
 from auth_service.config import settings
+from auth_service.database import get_pool_stats, query_cache_metrics, replica_router
+from auth_service.jobs import job_queue
+from auth_service.metrics import MetricsMiddleware, metrics, metrics_router
 from auth_service.routes import get_routes
+from auth_service.auth.hashing import password_hasher, bulk_password_hasher
+from auth_service.auth.loader import user_loader
+from auth_service.auth.repository import user_statements
+from auth_service.auth.config import auth_settings
+from auth_service.auth.password_policy import password_policy
+from auth_service.auth.refresh_tokens import purge_expired_refresh_tokens_periodically
+from auth_service.auth.revocation import revocation_list, revocation_sync
+from auth_service.auth.token_cache import token_cache
+from auth_service.auth.user_cache import user_cache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    if auth_settings.password_hash_target_ms is not None:
+        await asyncio.to_thread(password_policy.calibrate, auth_settings.password_hash_target_ms)
+
+    job_queue.start()
+    background_tasks = [asyncio.create_task(purge_expired_refresh_tokens_periodically())]
+    if auth_settings.token_revocation_enabled:
+        background_tasks.append(asyncio.create_task(revocation_sync.run()))
+    if replica_router.engines:
+        background_tasks.append(
+            asyncio.create_task(
+                replica_router.check_periodically(settings.db_settings.replica_check_interval_seconds)
+            )
+        )
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
+    # Before the hashers shut down, since queued password rehashes need them
+    await job_queue.stop()
+    password_hasher.shutdown()
+    bulk_password_hasher.shutdown()
 
 
 app = FastAPI(
@@ -9,12 +53,35 @@ app = FastAPI(
     version=settings.version,
     description=settings.description,
     debug=settings.debug,
+    lifespan=lifespan,
 )
 
 
 for route in get_routes():
     app.include_router(route)
 
+if settings.metrics_settings.enabled:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
+    metrics.add_collector(
+        "db_pool",
+        get_pool_stats,
+        counters=("checkouts", "checkout_wait_seconds", "checkout_timeouts"),
+    )
+    metrics.add_collector("db_query_cache", query_cache_metrics.stats, counters=("hits", "misses"))
+    metrics.add_collector("db_replicas", replica_router.stats, counters=("replica_reads", "fallback_reads"))
+    metrics.add_collector("token_cache", token_cache.stats, counters=("hits", "misses", "evictions"))
+    metrics.add_collector("user_cache", user_cache.stats, counters=("hits", "misses", "skipped_fills"))
+    metrics.add_collector("user_loader", user_loader.stats, counters=("loads", "coalesced", "batches"))
+    metrics.add_collector("user_statements", user_statements.stats, counters=("hits", "misses"))
+    metrics.add_collector(
+        "job_queue",
+        job_queue.stats,
+        counters=("enqueued", "coalesced", "completed", "failed", "dropped"),
+    )
+    metrics.add_collector("password_hasher", lambda: {"pending": password_hasher.pending})
+    metrics.add_collector("token_revocation", lambda: {"entries": len(revocation_list)})
+
 
 if __name__ == "__main__":
     import uvicorn
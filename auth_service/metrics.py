@@ -0,0 +1,188 @@
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from auth_service.config import settings
+
+
+# Upper bounds in seconds, from a cached token check to a slow login
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Methods recorded as is; any other method a client sends is recorded as "other"
+HTTP_METHODS: frozenset[str] = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], **extra: str) -> str:
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Histogram:
+    """Cumulative histogram per label set, rendered in the Prometheus text format.
+
+    Observing a value is a bisect and three additions, cheap enough for every request.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        # Per label values: count per bucket (the last one is +Inf), sum and count
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+
+        bucket_counts, totals = series
+        bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        totals[0] += value
+        totals[1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for label_values, (bucket_counts, (total, count)) in sorted(self._series.items()):
+            cumulative = 0
+            for upper_bound, bucket_count in zip((*self.buckets, "+Inf"), bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, label_values, le=str(upper_bound))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {int(count)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Histograms observed in-process plus gauges and counters read from stats functions at scrape time."""
+
+    def __init__(self) -> None:
+        self.histograms: list[Histogram] = []
+        self.collectors: list[tuple[str, Callable[[], dict[str, Any]], frozenset[str]]] = []
+
+    def histogram(self, name: str, description: str, label_names: tuple[str, ...] = ()) -> Histogram:
+        histogram = Histogram(name, description, label_names)
+        self.histograms.append(histogram)
+        return histogram
+
+    def add_collector(
+        self,
+        prefix: str,
+        collect: Callable[[], dict[str, Any]],
+        counters: tuple[str, ...] = (),
+    ) -> None:
+        """Expose every numeric value of `collect()` as the gauge `<prefix>_<key>`,
+        or as the counter `<prefix>_<key>_total` if the key is one of `counters`.
+        """
+        self.collectors.append((prefix, collect, frozenset(counters)))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for histogram in self.histograms:
+            lines.extend(histogram.render())
+
+        for prefix, collect, counters in self.collectors:
+            for key, value in collect().items():
+                if not isinstance(value, (int, float)):
+                    continue
+                if key in counters:
+                    lines.append(f"# TYPE {prefix}_{key}_total counter")
+                    lines.append(f"{prefix}_{key}_total {float(value)}")
+                else:
+                    lines.append(f"# TYPE {prefix}_{key} gauge")
+                    lines.append(f"{prefix}_{key} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+request_duration = metrics.histogram(
+    "http_request_duration_seconds",
+    "Time to handle an HTTP request.",
+    ("method", "route", "status"),
+)
+
+# Stages of a request: password_hash, password_verify, jwt_sign, jwt_verify, db_query, db_pool_checkout
+stage_duration = metrics.histogram(
+    "auth_stage_duration_seconds",
+    "Time spent in a stage of request handling.",
+    ("stage",),
+)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    if settings.metrics_settings.enabled:
+        stage_duration.observe(seconds, stage)
+
+
+@contextmanager
+def time_stage(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """Records the duration of every request by method, route template and status."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The route template and known methods keep the number of series bounded,
+            # unlike the raw path and method
+            route = scope.get("route")
+            request_duration.observe(
+                time.perf_counter() - started,
+                scope["method"] if scope["method"] in HTTP_METHODS else "other",
+                getattr(route, "path", "unmatched"),
+                str(status_code),
+            )
+
+
+metrics_router = APIRouter(
+    tags=["Metrics"],
+)
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,93 @@
+"""Sign and verify throughput of the supported JWT signing algorithms.
+
+Signs and verifies an access-token-sized payload with freshly generated keys:
+
+    python -m benchmarks.jwt_algorithms --duration 2
+"""
+import argparse
+import datetime
+import time
+import uuid
+from typing import Any, Callable
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+import jwt
+
+
+ALGORITHMS: tuple[str, ...] = ("RS256", "PS256", "ES256", "EdDSA")
+
+
+def generate_keys() -> dict[str, Any]:
+    return {
+        "RS256": rsa.generate_private_key(public_exponent=65537, key_size=2048),
+        "PS256": rsa.generate_private_key(public_exponent=65537, key_size=2048),
+        "ES256": ec.generate_private_key(ec.SECP256R1()),
+        "EdDSA": ed25519.Ed25519PrivateKey.generate(),
+    }
+
+
+def make_payload() -> dict[str, Any]:
+    now = datetime.datetime.now(datetime.UTC)
+    return {
+        "type": "access",
+        "sub": str(uuid.uuid4()),
+        "username": "benchmark",
+        "email": "benchmark@example.com",
+        "is_active": True,
+        "jti": str(uuid.uuid4()),
+        "ver": 0,
+        "iat": now,
+        "exp": now + datetime.timedelta(minutes=15),
+    }
+
+
+def ops_per_second(operation: Callable[[], Any], duration: float) -> float:
+    operations = 0
+    started_at = time.perf_counter()
+    deadline = started_at + duration
+    while time.perf_counter() < deadline:
+        operation()
+        operations += 1
+    return operations / (time.perf_counter() - started_at)
+
+
+def run(duration: float, algorithms: list[str]) -> list[dict[str, Any]]:
+    keys = generate_keys()
+    payload = make_payload()
+
+    results = []
+    for algorithm in algorithms:
+        private_key = keys[algorithm]
+        public_key = private_key.public_key()
+        token = jwt.encode(payload, private_key, algorithm=algorithm)
+
+        sign = ops_per_second(lambda: jwt.encode(payload, private_key, algorithm=algorithm), duration)
+        verify = ops_per_second(lambda: jwt.decode(token, public_key, algorithms=[algorithm]), duration)
+        results.append(
+            {
+                "algorithm": algorithm,
+                "sign_ops_per_s": round(sign),
+                "verify_ops_per_s": round(verify),
+                "token_bytes": len(token),
+            }
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per algorithm and operation")
+    parser.add_argument("--algorithm", action="append", choices=ALGORITHMS, dest="algorithms")
+    args = parser.parse_args()
+
+    results = run(args.duration, args.algorithms or list(ALGORITHMS))
+
+    print(f"{'algorithm':>10} {'sign/s':>10} {'verify/s':>10} {'bytes':>6}")
+    for result in results:
+        print(
+            f"{result['algorithm']:>10} {result['sign_ops_per_s']:>10} "
+            f"{result['verify_ops_per_s']:>10} {result['token_bytes']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Login throughput and `/users/me` latency while logins are running.
+
+Runs the ASGI app in-process with in-memory user and refresh token stores,
+so only hashing, JWT and framework costs are measured:
+
+    python -m benchmarks.login_under_load --duration 10 --concurrency 8
+
+`--mode inline` verifies passwords on the event loop the way the service did
+before hashing was moved to a worker pool, for comparison.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Sequence
+
+
+def configure_environment(directory: Path) -> None:
+    # The engine is created at import time but never connected to
+    for name, value in {"DB_HOST": "localhost", "DB_PORT": "5432", "DB_NAME": "auth", "DB_USER": "auth"}.items():
+        os.environ.setdefault(name, value)
+    # Every request comes from the same client and user, and the benchmarks measure the service
+    # itself, not the login rate limiter
+    os.environ.setdefault("LOGIN_RATE_LIMIT_ENABLED", "false")
+
+    private_key = directory / "private.pem"
+    public_key = directory / "public.pem"
+    subprocess.run(["openssl", "genrsa", "-out", private_key, "2048"], check=True, capture_output=True)
+    subprocess.run(
+        ["openssl", "rsa", "-in", private_key, "-outform", "PEM", "-pubout", "-out", public_key],
+        check=True,
+        capture_output=True,
+    )
+    os.environ.setdefault("PRIVATE_KEY_PATH", str(private_key))
+    os.environ.setdefault("PUBLIC_KEY_PATH", str(public_key))
+
+
+class InMemoryUserRepository:
+    def __init__(self, users: list[SimpleNamespace]) -> None:
+        self.users = users
+
+    async def get_single(
+        self,
+        columns: Sequence[str] | None = None,
+        replica: bool = True,
+        **filters: Any,
+    ) -> SimpleNamespace | None:
+        for user in self.users:
+            if all(str(getattr(user, key)) == str(value) for key, value in filters.items()):
+                return user
+        return None
+
+    async def get_token_state(self, id: uuid.UUID) -> tuple[bool, int] | None:
+        user = await self.get_single(id=id)
+        return (user.is_active, user.token_version) if user else None
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(duration: float, concurrency: int, mode: str) -> dict[str, Any]:
+    import httpx
+
+    from auth_service.main import app
+    from auth_service.auth import dependencies
+    from auth_service.auth.service import UserService
+    from auth_service.auth.refresh_tokens import InMemoryRefreshTokenStore
+    from auth_service.auth.utils import get_password_hash, validate_password, create_access_token
+
+    password = "benchmark-password"
+    user = SimpleNamespace(
+        id=uuid.uuid4(),
+        username="benchmark",
+        email="benchmark@example.com",
+        hashed_password=get_password_hash(password),
+        is_active=True,
+        is_admin=False,
+        token_version=0,
+    )
+    repository = InMemoryUserRepository([user])
+    refresh_token_store = InMemoryRefreshTokenStore()
+    app.dependency_overrides[dependencies.get_user_service] = lambda: UserService(repository)  # type: ignore
+    app.dependency_overrides[dependencies.get_refresh_token_store] = lambda: refresh_token_store
+
+    if mode == "inline":
+        async def validate_inline(password: str, hashed_password: str) -> bool:
+            return validate_password(password, hashed_password)
+
+        dependencies.validate_password_async = validate_inline  # type: ignore
+
+    token = create_access_token(user)  # type: ignore
+    logins = 0
+    rejected = 0
+    me_latencies: list[float] = []
+    deadline = time.perf_counter() + duration
+
+    transport = httpx.ASGITransport(app=app)  # type: ignore
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        async def login_worker() -> None:
+            nonlocal logins, rejected
+            while time.perf_counter() < deadline:
+                response = await client.post(
+                    "/auth/login",
+                    data={"username": user.username, "password": password},
+                )
+                if response.status_code == 200:
+                    logins += 1
+                else:
+                    rejected += 1
+
+        async def me_probe() -> None:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+                response.raise_for_status()
+                me_latencies.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(me_probe(), *(login_worker() for _ in range(concurrency)))
+
+    app.dependency_overrides.clear()
+    return {
+        "mode": mode,
+        "duration_s": duration,
+        "concurrency": concurrency,
+        "logins_per_s": round(logins / duration, 2),
+        "rejected_logins": rejected,
+        "me_requests": len(me_latencies),
+        "me_p50_ms": round(statistics.median(me_latencies), 2) if me_latencies else 0.0,
+        "me_p99_ms": round(percentile(me_latencies, 99), 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mode", choices=["pool", "inline"], default="pool")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        configure_environment(Path(directory))
+        result = asyncio.run(run(args.duration, args.concurrency, args.mode))
+
+    for key, value in result.items():
+        print(f"{key:>16}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Cost per token of encoding and verifying access tokens.
+
+Compares passing PEM strings to `jwt.encode`/`jwt.decode`, as `auth/utils.py`
+used to, with the `TokenCodec` and its batch verification:
+
+    python -m benchmarks.token_codec --duration 2 --batch-size 100
+"""
+import argparse
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable
+
+from benchmarks.login_under_load import configure_environment
+
+
+def microseconds_per_call(operation: Callable[[], Any], duration: float, calls_per_operation: int = 1) -> float:
+    operations = 0
+    started_at = time.perf_counter()
+    deadline = started_at + duration
+    while time.perf_counter() < deadline:
+        operation()
+        operations += 1
+    return (time.perf_counter() - started_at) / (operations * calls_per_operation) * 1_000_000
+
+
+def run(duration: float, batch_size: int) -> dict[str, float]:
+    import jwt
+
+    from auth_service.auth.config import auth_settings
+    from auth_service.auth.codec import token_codec
+
+    private_pem = auth_settings.private_key_path.read_text()
+    public_pem = auth_settings.public_key_path.read_text()
+    now = int(time.time())
+    payload = {
+        "type": "access",
+        "sub": str(uuid.uuid4()),
+        "username": "benchmark",
+        "email": "benchmark@example.com",
+        "is_active": True,
+        "jti": str(uuid.uuid4()),
+        "ver": 0,
+        "iat": now,
+        "exp": now + 15 * 60,
+    }
+    pem_token = jwt.encode(payload, private_pem, algorithm="RS256")
+    codec_token = token_codec.encode(payload)
+    batch = [codec_token] * batch_size
+
+    return {
+        "pem_encode_us": microseconds_per_call(
+            lambda: jwt.encode(payload, private_pem, algorithm="RS256"), duration
+        ),
+        "codec_encode_us": microseconds_per_call(lambda: token_codec.encode(payload), duration),
+        "pem_decode_us": microseconds_per_call(
+            lambda: jwt.decode(pem_token, public_pem, algorithms=["RS256"]), duration
+        ),
+        "codec_decode_us": microseconds_per_call(lambda: token_codec.decode(codec_token), duration),
+        "codec_decode_many_us": microseconds_per_call(
+            lambda: token_codec.decode_many(batch), duration, calls_per_operation=batch_size
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per measured operation")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        configure_environment(Path(directory))
+        result = run(args.duration, args.batch_size)
+
+    for key, value in result.items():
+        print(f"{key:>20}: {value:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import asyncio
+from pathlib import Path
+from typing import Any, AsyncGenerator, Awaitable, Callable
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from auth_service.main import app
+from auth_service.models import Base
+from auth_service.database import RoutingSession, get_async_session
+from auth_service.auth.config import auth_settings
+from auth_service.auth.models import User
+from auth_service.auth.rate_limit import InMemoryRateLimitBackend, login_rate_limiter
+from auth_service.auth.user_cache import user_cache
+
+
+@pytest.fixture
+def run_with_users(tmp_path: Path) -> Callable[..., Any]:
+    """Run `test` with a session maker of a SQLite database holding users with the given usernames."""
+
+    def run(usernames: list[str], test: Callable[[async_sessionmaker[AsyncSession]], Awaitable[Any]]) -> Any:
+        async def main() -> Any:
+            engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'users.db'}")
+            async with engine.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all)
+            session_maker = async_sessionmaker(engine, sync_session_class=RoutingSession, expire_on_commit=False)
+            async with session_maker() as session:
+                session.add_all(
+                    User(username=username, email=f"{username}@example.com", hashed_password="hash")
+                    for username in usernames
+                )
+                await session.commit()
+
+            try:
+                return await test(session_maker)
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture
+def run_with_app(run_with_users: Callable[..., Any], monkeypatch: pytest.MonkeyPatch) -> Callable[..., Any]:
+    """Run `test` with a client of the app, whose sessions use the database of `run_with_users`."""
+    # The shared loader reads through its own session maker, not the overridden sessions
+    monkeypatch.setattr(auth_settings, "user_loader_enabled", False)
+    monkeypatch.setattr(login_rate_limiter, "backend", InMemoryRateLimitBackend())
+    user_cache.local.clear()
+    user_cache.invalidated.clear()
+
+    def run(
+        usernames: list[str],
+        test: Callable[[httpx.AsyncClient, async_sessionmaker[AsyncSession]], Awaitable[Any]],
+    ) -> Any:
+        async def with_app(session_maker: async_sessionmaker[AsyncSession]) -> Any:
+            async def get_test_session() -> AsyncGenerator[AsyncSession, None]:
+                async with session_maker() as session:
+                    yield session
+
+            app.dependency_overrides[get_async_session] = get_test_session
+            try:
+                transport = httpx.ASGITransport(app=app)  # type: ignore
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    return await test(client, session_maker)
+            finally:
+                app.dependency_overrides.clear()
+
+        return run_with_users(usernames, with_app)
+
+    return run
+
+
+async def sign_up(client: httpx.AsyncClient, username: str, password: str = "password") -> dict[str, str]:
+    """Create a user through the API and log in, returning the issued tokens."""
+    response = await client.post(
+        "/users/",
+        json={"username": username, "email": f"{username}@example.com", "password": password},
+    )
+    assert response.status_code == 200, response.text
+    response = await client.post("/auth/login", data={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def bearer(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,106 @@
+import json
+import time
+from typing import Any, Callable
+import jwt
+import pytest
+from jwt.algorithms import get_default_algorithms
+from jwt.exceptions import InvalidTokenError
+from jwt.utils import base64url_encode
+
+from auth_service.auth.codec import TokenCodec
+from auth_service.auth.keys import key_manager
+
+
+codec = TokenCodec()
+KEY = key_manager.signing_key
+NOW = int(time.time())
+
+
+def sign_raw(raw_payload: bytes, header_segment: bytes = KEY.header_segment) -> str:  # type: ignore
+    signing_input = header_segment + b"." + base64url_encode(raw_payload)
+    signature = get_default_algorithms()[KEY.algorithm].sign(signing_input, KEY.private_key)  # type: ignore
+    return (signing_input + b"." + base64url_encode(signature)).decode("ascii")
+
+
+def sign(payload: dict[str, Any]) -> str:
+    return sign_raw(json.dumps(payload).encode("utf-8"))
+
+
+def replace_segment(token: str, index: int, segment: str) -> str:
+    segments = token.split(".")
+    segments[index] = segment
+    return ".".join(segments)
+
+
+VALID = {"sub": "alice", "iat": NOW, "exp": NOW + 60}
+
+TOKENS: dict[str, Callable[[], str]] = {
+    "valid": lambda: codec.encode(VALID),
+    "valid, signed by PyJWT": lambda: jwt.encode(
+        VALID, KEY.private_key, algorithm=KEY.algorithm, headers={"kid": KEY.kid}
+    ),
+    "valid, without kid": lambda: jwt.encode(VALID, KEY.private_key, algorithm=KEY.algorithm),
+    "expired, without kid": lambda: jwt.encode({**VALID, "exp": NOW - 10}, KEY.private_key, algorithm=KEY.algorithm),
+    "float time claims": lambda: sign({"sub": "alice", "iat": NOW + 0.5, "exp": NOW + 60.5}),
+    "nbf in the past": lambda: sign({**VALID, "nbf": NOW - 60}),
+    "expired": lambda: sign({**VALID, "exp": NOW - 10}),
+    "without exp": lambda: sign({"sub": "alice", "iat": NOW}),
+    "iat in the future": lambda: sign({**VALID, "iat": NOW + 600}),
+    "nbf in the future": lambda: sign({**VALID, "nbf": NOW + 600}),
+    "tampered signature": lambda: replace_segment(sign(VALID), 2, sign({**VALID, "sub": "bob"}).split(".")[2]),
+    "tampered payload": lambda: replace_segment(sign(VALID), 1, sign({**VALID, "sub": "bob"}).split(".")[1]),
+    "HS256 header": lambda: jwt.encode(VALID, "secret", algorithm="HS256", headers={"kid": KEY.kid}),
+    "none algorithm": lambda: jwt.encode(VALID, None, algorithm="none", headers={"kid": KEY.kid}),
+    "payload that is not an object": lambda: sign_raw(b"[1, 2]"),
+    "payload that is not JSON": lambda: sign_raw(b"not json"),
+    "payload that is not base64": lambda: replace_segment(sign(VALID), 1, "not base64!"),
+    "signature that is not base64": lambda: replace_segment(sign(VALID), 2, "not base64!"),
+    "two segments": lambda: sign(VALID).rpartition(".")[0],
+    "one segment": lambda: "token",
+    "empty": lambda: "",
+}
+
+
+def decode_with(decode: Callable[[str], dict[str, Any]], token: str) -> dict[str, Any] | type[Exception]:
+    try:
+        return decode(token)
+    except InvalidTokenError as exc:
+        return type(exc)
+
+
+def decode_with_pyjwt(token: str) -> dict[str, Any]:
+    return jwt.decode(token, KEY.public_key, algorithms=[KEY.algorithm], options={"require": ["exp"]})  # type: ignore
+
+
+@pytest.mark.parametrize("name", TOKENS)
+def test_codec_decodes_like_pyjwt(name: str) -> None:
+    token = TOKENS[name]()
+
+    expected = decode_with(decode_with_pyjwt, token)
+    result = decode_with(codec.decode, token)
+
+    assert result == expected
+
+
+@pytest.mark.parametrize("claim", ["exp", "iat", "nbf"])
+@pytest.mark.parametrize("value", ["99999999999", None, True, [NOW], float("inf"), float("nan")])
+def test_time_claims_that_are_not_numbers_are_rejected(claim: str, value: Any) -> None:
+    token = sign_raw(json.dumps({**VALID, claim: value}).encode("utf-8"))
+    generic_token = jwt.encode({**VALID, claim: value}, KEY.private_key, algorithm=KEY.algorithm)
+
+    for token in (token, generic_token):
+        with pytest.raises(InvalidTokenError):
+            codec.decode(token)
+
+
+def test_tokens_of_unknown_keys_are_rejected() -> None:
+    token = jwt.encode(VALID, KEY.private_key, algorithm=KEY.algorithm, headers={"kid": "unknown"})
+
+    with pytest.raises(InvalidTokenError):
+        codec.decode(token)
+
+
+def test_decode_many_gives_none_for_invalid_tokens() -> None:
+    tokens = [TOKENS["valid"](), TOKENS["expired"](), TOKENS["tampered signature"](), "token"]
+
+    assert codec.decode_many(tokens) == [VALID, None, None, None]
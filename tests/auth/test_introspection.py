@@ -0,0 +1,68 @@
+from typing import Any, Callable
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from auth_service.auth.repository import UserRepository
+from auth_service.auth.utils import ACCESS_TOKEN_TYPE, decode_jwt, encode_jwt
+from tests.auth.conftest import bearer, sign_up
+
+
+def expire(token: str) -> str:
+    payload = decode_jwt(token)
+    del payload["iat"], payload["exp"]
+    return encode_jwt(payload, expire_minutes=-1)
+
+
+def test_introspection_reports_only_valid_tokens_as_active(run_with_app: Callable[..., Any]) -> None:
+    async def test(client: httpx.AsyncClient, session_maker: async_sessionmaker[AsyncSession]) -> list[dict[str, Any]]:
+        await sign_up(client, "admin")
+        async with session_maker() as session:
+            await UserRepository(session).update(data={"is_admin": True}, username="admin")
+        admin_token = (await client.post("/auth/login", data={"username": "admin", "password": "password"})).json()
+
+        alice_tokens = await sign_up(client, "alice")
+        revoked_token = (await sign_up(client, "bob"))["access_token"]
+        assert (await client.post("/auth/logout", headers=bearer(revoked_token))).status_code == 204
+        deleted_user_token = (await sign_up(client, "carol"))["access_token"]
+        assert (await client.delete("/users/", headers=bearer(deleted_user_token))).status_code == 200
+        deactivated_user_token = (await sign_up(client, "dave"))["access_token"]
+        async with session_maker() as session:
+            await UserRepository(session).update(data={"is_active": False}, username="dave")
+
+        tokens = [
+            alice_tokens["access_token"],
+            revoked_token,
+            expire(alice_tokens["access_token"]),
+            deleted_user_token,
+            deactivated_user_token,
+            alice_tokens["refresh_token"],
+            "not a token",
+        ]
+        response = await client.post(
+            "/auth/introspect",
+            json={"tokens": tokens},
+            headers=bearer(admin_token["access_token"]),
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    results = run_with_app([], test)
+
+    assert [result["active"] for result in results] == [True, False, False, False, False, False, False]
+    assert results[0]["token_type"] == ACCESS_TOKEN_TYPE
+    assert results[0]["username"] == "alice"
+    assert results[0]["exp"] > results[0]["iat"]
+    assert all(result == {"active": False} for result in results[1:])
+
+
+def test_introspection_is_for_admins_only(run_with_app: Callable[..., Any]) -> None:
+    async def test(client: httpx.AsyncClient, session_maker: async_sessionmaker[AsyncSession]) -> int:
+        tokens = await sign_up(client, "alice")
+        response = await client.post(
+            "/auth/introspect",
+            json={"tokens": [tokens["access_token"]]},
+            headers=bearer(tokens["access_token"]),
+        )
+        return response.status_code
+
+    assert run_with_app([], test) == 403
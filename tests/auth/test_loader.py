@@ -0,0 +1,59 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Callable
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from auth_service.auth.loader import UserLoader
+from auth_service.auth.models import User
+from auth_service.auth.repository import UserRepository
+
+
+def test_concurrent_lookups_share_one_batch(run_with_users: Callable[..., Any]) -> None:
+    usernames = ["alice", "bob", "carol"]
+
+    async def test(session_maker: async_sessionmaker[AsyncSession]) -> UserLoader:
+        loader = UserLoader(session_maker, window=10.0)
+        lookups = [*usernames, *usernames, "nobody"]
+        users = await asyncio.gather(*(loader.load("username", username, ("email",)) for username in lookups))
+
+        assert [user.email if user else None for user in users] == [
+            *(f"{username}@example.com" for username in lookups[:-1]),
+            None,
+        ]
+        return loader
+
+    loader = run_with_users(usernames, test)
+
+    assert loader.stats() == {"loads": 7, "coalesced": 3, "batches": 1}
+
+
+def test_lone_lookup_does_not_wait_for_the_window(run_with_users: Callable[..., Any]) -> None:
+    async def test(session_maker: async_sessionmaker[AsyncSession]) -> float:
+        loader = UserLoader(session_maker, window=10.0)
+        started = time.perf_counter()
+        user = await loader.load("username", "alice", ("username",))
+        assert user.username == "alice"
+        return time.perf_counter() - started
+
+    assert run_with_users(["alice"], test) < 5.0
+
+
+def test_lookups_bypass_the_loader_after_writes(run_with_users: Callable[..., Any]) -> None:
+    async def test(session_maker: async_sessionmaker[AsyncSession]) -> UserLoader:
+        loader = UserLoader(session_maker)
+        async with session_maker() as session:
+            repository = UserRepository(session, loader)
+            assert await repository.get_single(columns=("username",), username="alice") is not None
+
+            user_id = uuid.uuid4()
+            session.add(User(id=user_id, username="bob", email="bob@example.com", hashed_password="hash"))
+            await session.flush()
+            # Only this session sees the uncommitted user
+            user = await repository.get_single(columns=("username",), id=user_id)
+            assert user is not None and user.username == "bob"
+        return loader
+
+    loader = run_with_users(["alice"], test)
+
+    assert loader.stats()["loads"] == 1
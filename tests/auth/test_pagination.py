@@ -0,0 +1,38 @@
+import base64
+import uuid
+import pytest
+
+from auth_service.auth.exceptions import InvalidCursor
+from auth_service.auth.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip() -> None:
+    last_id = uuid.uuid4()
+
+    assert decode_cursor(encode_cursor("username", "alice", last_id)) == ("username", "alice", last_id)
+
+
+def test_cursor_sorted_by_id_decodes_the_value_as_uuid() -> None:
+    last_id = uuid.uuid4()
+
+    assert decode_cursor(encode_cursor("id", last_id, last_id)) == ("id", last_id, last_id)
+
+
+def test_tampered_cursor_is_rejected() -> None:
+    cursor = encode_cursor("username", "alice", uuid.uuid4())
+    raw_cursor = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    tampered = base64.urlsafe_b64encode(raw_cursor.replace(b"alice", b"bobby")).rstrip(b"=").decode("ascii")
+
+    with pytest.raises(InvalidCursor):
+        decode_cursor(tampered)
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "", "c2hvcnQ"])
+def test_malformed_cursor_is_rejected(cursor: str) -> None:
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_cursor_with_unsupported_sort_column_is_rejected() -> None:
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor("hashed_password", "x", uuid.uuid4()))
@@ -0,0 +1,144 @@
+from typing import Any, Callable
+from uuid import UUID
+import httpx
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from auth_service.auth import dependencies
+from auth_service.auth.models import User
+from auth_service.auth.password_policy import PasswordPolicy, password_policy
+from auth_service.auth.repository import UserRepository
+from auth_service.auth.service import UserService
+from tests.auth.conftest import sign_up
+
+
+def argon2_policy(**kwargs: Any) -> PasswordPolicy:
+    options = {"argon2_time_cost": 1, "argon2_memory_cost": 8, "argon2_parallelism": 1} | kwargs
+    return PasswordPolicy(scheme="argon2id", **options)
+
+
+@pytest.mark.parametrize("policy", [PasswordPolicy(bcrypt_rounds=4), argon2_policy()], ids=["bcrypt", "argon2id"])
+def test_hashes_verify_only_their_password(policy: PasswordPolicy) -> None:
+    hashed_password = policy.hash("password")
+
+    assert policy.verify("password", hashed_password)
+    assert not policy.verify("other password", hashed_password)
+
+
+def test_hashes_of_either_scheme_are_verified() -> None:
+    bcrypt_hash = PasswordPolicy(bcrypt_rounds=4).hash("password")
+    argon2_hash = argon2_policy().hash("password")
+
+    for policy in (PasswordPolicy(bcrypt_rounds=4), argon2_policy()):
+        assert policy.verify("password", bcrypt_hash)
+        assert policy.verify("password", argon2_hash)
+
+
+@pytest.mark.parametrize(
+    "hashed_password",
+    ["", "plaintext", "$2b$12$garbage", "$2b$", "$argon2id$garbage", "$argon2i$v=19$m=8,t=1,p=1$c2FsdHNhbHQ$aGFzaA"],
+)
+def test_malformed_and_unknown_hashes_do_not_verify(hashed_password: str) -> None:
+    assert not PasswordPolicy(bcrypt_rounds=4).verify("password", hashed_password)
+
+
+def test_bcrypt_hashes_need_a_rehash_below_the_policy_rounds() -> None:
+    policy = PasswordPolicy(bcrypt_rounds=5)
+
+    assert policy.needs_rehash(PasswordPolicy(bcrypt_rounds=4).hash("password"))
+    assert not policy.needs_rehash(PasswordPolicy(bcrypt_rounds=5).hash("password"))
+    # Hashes of workers calibrated higher are kept
+    assert not policy.needs_rehash(PasswordPolicy(bcrypt_rounds=6).hash("password"))
+    assert policy.needs_rehash(argon2_policy().hash("password"))
+    assert policy.needs_rehash("$2b$garbage")
+
+
+def test_argon2_hashes_need_a_rehash_below_the_policy_costs() -> None:
+    policy = argon2_policy(argon2_time_cost=2, argon2_memory_cost=16)
+
+    assert policy.needs_rehash(argon2_policy(argon2_time_cost=1, argon2_memory_cost=16).hash("password"))
+    assert policy.needs_rehash(argon2_policy(argon2_time_cost=2, argon2_memory_cost=8).hash("password"))
+    assert not policy.needs_rehash(argon2_policy(argon2_time_cost=2, argon2_memory_cost=16).hash("password"))
+    assert not policy.needs_rehash(argon2_policy(argon2_time_cost=3, argon2_memory_cost=32).hash("password"))
+    assert policy.needs_rehash(PasswordPolicy(bcrypt_rounds=4).hash("password"))
+    assert policy.needs_rehash("$argon2id$garbage")
+
+
+def test_calibrate_raises_bcrypt_rounds_up_to_the_target(monkeypatch: pytest.MonkeyPatch) -> None:
+    policy = PasswordPolicy(bcrypt_rounds=4)
+    # 1 ms at 4 rounds, doubling with every round
+    monkeypatch.setattr(policy, "_time_hash_ms", lambda: 2.0 ** (policy.bcrypt_rounds - 4))
+
+    policy.calibrate(target_ms=40)
+
+    assert policy.bcrypt_rounds == 9
+
+
+def test_calibrate_keeps_the_configured_cost_as_the_minimum(monkeypatch: pytest.MonkeyPatch) -> None:
+    policy = PasswordPolicy(bcrypt_rounds=12)
+    monkeypatch.setattr(policy, "_time_hash_ms", lambda: 2.0 ** (policy.bcrypt_rounds - 4))
+
+    policy.calibrate(target_ms=1)
+
+    assert policy.bcrypt_rounds == 12
+
+
+def test_calibrate_raises_argon2_time_cost_up_to_the_target(monkeypatch: pytest.MonkeyPatch) -> None:
+    policy = argon2_policy(argon2_time_cost=3)
+    monkeypatch.setattr(policy, "_time_hash_ms", lambda: 10.0 * policy.argon2_time_cost)
+
+    policy.calibrate(target_ms=45)
+
+    assert policy.argon2_time_cost == 4
+    assert policy.argon2_memory_cost == 8
+
+
+def test_login_queues_a_rehash_of_outdated_hashes(
+    run_with_app: Callable[..., Any],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    jobs: list[tuple[str, dict[str, Any], dict[str, Any]]] = []
+
+    def enqueue(kind: str, payload: dict[str, Any], **kwargs: Any) -> None:
+        jobs.append((kind, payload, kwargs))
+
+    monkeypatch.setattr(dependencies.job_queue, "enqueue", enqueue)
+
+    async def test(client: httpx.AsyncClient, session_maker: async_sessionmaker[AsyncSession]) -> tuple[str, str]:
+        await sign_up(client, "alice")
+        assert jobs == []
+
+        monkeypatch.setattr(password_policy, "bcrypt_rounds", password_policy.bcrypt_rounds + 1)
+        response = await client.post("/auth/login", data={"username": "alice", "password": "password"})
+        assert response.status_code == 200
+
+        async with session_maker() as session:
+            user_service = UserService(UserRepository(session))
+            _, payload, _ = jobs[0]
+            arguments = (UUID(payload["user_id"]), payload["password"], payload["hashed_password"])
+            assert await user_service.rehash_password(*arguments)
+            # The hash it replaced is gone, so running the job again changes nothing
+            assert not await user_service.rehash_password(*arguments)
+            new_hashed_password = (await session.execute(select(User.hashed_password))).scalar_one()
+        return payload["hashed_password"], new_hashed_password
+
+    old_hashed_password, new_hashed_password = run_with_app([], test)
+
+    assert [(kind, kwargs) for kind, _, kwargs in jobs] == [
+        (dependencies.REHASH_PASSWORD_JOB, {"key": jobs[0][1]["user_id"], "durable": False})
+    ]
+    assert password_policy.needs_rehash(old_hashed_password)
+    assert not password_policy.needs_rehash(new_hashed_password)
+    assert password_policy.verify("password", new_hashed_password)
+
+
+def test_login_with_a_malformed_stored_hash_is_rejected(run_with_app: Callable[..., Any]) -> None:
+    async def test(client: httpx.AsyncClient, session_maker: async_sessionmaker[AsyncSession]) -> int:
+        async with session_maker() as session:
+            await UserRepository(session).update(data={"hashed_password": "$2b$12$garbage"}, username="alice")
+
+        response = await client.post("/auth/login", data={"username": "alice", "password": "password"})
+        return response.status_code
+
+    assert run_with_app(["alice"], test) == 401
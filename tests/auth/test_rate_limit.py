@@ -0,0 +1,156 @@
+import asyncio
+import time
+from typing import Any, Callable
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from auth_service.auth.exceptions import RateLimitExceeded
+from auth_service.auth.rate_limit import (
+    InMemoryRateLimitBackend,
+    LoginRateLimiter,
+    RateLimitBackend,
+    login_rate_limiter,
+)
+from tests.auth.conftest import sign_up
+
+
+class Clock:
+    def __init__(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self.now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: self.now)
+
+
+class FailingBackend(RateLimitBackend):
+    async def take(self, key: str, capacity: int, refill_per_second: float) -> float:
+        raise ConnectionError("Backend is down")
+
+    async def add_failure(self, key: str, ttl: float) -> int:
+        raise ConnectionError("Backend is down")
+
+    async def block(self, key: str, seconds: float) -> None:
+        raise ConnectionError("Backend is down")
+
+    async def blocked_for(self, key: str) -> float:
+        raise ConnectionError("Backend is down")
+
+    async def reset(self, *keys: str) -> None:
+        raise ConnectionError("Backend is down")
+
+
+def make_limiter(backend: RateLimitBackend | None = None, **kwargs: Any) -> LoginRateLimiter:
+    options: dict[str, Any] = {
+        "ip_capacity": 100,
+        "ip_refill_per_second": 1.0,
+        "username_capacity": 100,
+        "username_refill_per_second": 1.0,
+        "backoff_threshold": 3,
+        "backoff_base_seconds": 1.0,
+        "backoff_max_seconds": 3.0,
+    }
+    return LoginRateLimiter(backend or InMemoryRateLimitBackend(), **(options | kwargs))
+
+
+def retry_after(limiter: LoginRateLimiter, client_ip: str = "10.0.0.1", username: str = "alice") -> float:
+    try:
+        asyncio.run(limiter.check(client_ip, username))
+    except RateLimitExceeded as exc:
+        return exc.retry_after
+    return 0.0
+
+
+def test_bucket_refills_over_time(monkeypatch: pytest.MonkeyPatch) -> None:
+    clock = Clock(monkeypatch)
+    backend = InMemoryRateLimitBackend()
+
+    async def take() -> float:
+        return await backend.take("key", capacity=2, refill_per_second=0.5)
+
+    assert [asyncio.run(take()) for _ in range(3)] == [0.0, 0.0, 2.0]
+
+    clock.now += 1.0
+    assert asyncio.run(take()) == pytest.approx(1.0)
+    clock.now += 2.0
+    assert asyncio.run(take()) == 0.0
+
+
+def test_attempts_are_limited_per_ip_and_per_username(monkeypatch: pytest.MonkeyPatch) -> None:
+    Clock(monkeypatch)
+    limiter = make_limiter(ip_capacity=4, username_capacity=2)
+
+    assert [retry_after(limiter, username="alice") for _ in range(3)] == [0.0, 0.0, 1.0]
+    # Rejected attempts use up the IP's tokens too; the last one may go to another username
+    assert retry_after(limiter, username="bob") == 0.0
+    assert retry_after(limiter, username="carol") == 1.0
+    # Other IPs are not affected by this IP's attempts, but still by the username's
+    assert retry_after(limiter, client_ip="10.0.0.2", username="carol") == 0.0
+    assert retry_after(limiter, client_ip="10.0.0.2", username="alice") == 1.0
+
+
+def test_failures_block_the_username_for_growing_delays(monkeypatch: pytest.MonkeyPatch) -> None:
+    clock = Clock(monkeypatch)
+    limiter = make_limiter()
+
+    delays = []
+    for _ in range(5):
+        asyncio.run(limiter.record_failure("alice"))
+        delays.append(retry_after(limiter))
+        clock.now += delays[-1]
+
+    assert delays == [0.0, 0.0, 1.0, 2.0, 3.0]
+    assert retry_after(limiter, username="bob") == 0.0
+
+
+def test_success_resets_failures(monkeypatch: pytest.MonkeyPatch) -> None:
+    Clock(monkeypatch)
+    limiter = make_limiter()
+    for _ in range(3):
+        asyncio.run(limiter.record_failure("alice"))
+    assert retry_after(limiter) == 1.0
+
+    asyncio.run(limiter.record_success("alice"))
+    asyncio.run(limiter.record_failure("alice"))
+
+    assert retry_after(limiter) == 0.0
+
+
+def test_logins_are_let_through_when_the_backend_fails() -> None:
+    limiter = make_limiter(FailingBackend())
+
+    assert retry_after(limiter) == 0.0
+    asyncio.run(limiter.record_failure("alice"))
+    asyncio.run(limiter.record_success("alice"))
+
+
+def test_login_is_rejected_with_retry_after(run_with_app: Callable[..., Any], monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(login_rate_limiter, "username_capacity", 2)
+    monkeypatch.setattr(login_rate_limiter, "username_refill_per_second", 0.1)
+
+    async def test(client: httpx.AsyncClient, session_maker: async_sessionmaker[AsyncSession]) -> httpx.Response:
+        # Signing up logs in once
+        await sign_up(client, "alice")
+        response = await client.post("/auth/login", data={"username": "alice", "password": "password"})
+        assert response.status_code == 200
+        return await client.post("/auth/login", data={"username": "alice", "password": "password"})
+
+    response = run_with_app([], test)
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "10"
+
+
+def test_failed_logins_block_the_username(run_with_app: Callable[..., Any], monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(login_rate_limiter, "backoff_threshold", 2)
+    monkeypatch.setattr(login_rate_limiter, "backoff_base_seconds", 30.0)
+
+    async def test(client: httpx.AsyncClient, session_maker: async_sessionmaker[AsyncSession]) -> list[httpx.Response]:
+        await sign_up(client, "alice")
+        return [
+            await client.post("/auth/login", data={"username": "alice", "password": password})
+            for password in ("wrong", "wrong", "password")
+        ]
+
+    responses = run_with_app([], test)
+
+    assert [response.status_code for response in responses] == [401, 401, 429]
+    assert responses[-1].headers["Retry-After"] == "30"
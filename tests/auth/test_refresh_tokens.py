@@ -0,0 +1,126 @@
+import datetime
+import uuid
+from typing import Any, Awaitable, Callable
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from auth_service.auth.exceptions import InvalidRefreshToken, RefreshTokenReused
+from auth_service.auth.refresh_tokens import (
+    DatabaseRefreshTokenStore,
+    InMemoryRefreshTokenStore,
+    RefreshTokenStore,
+    issue_refresh_token,
+    rotate_refresh_token,
+)
+from auth_service.auth.scemas import RefreshTokenRecord, UserGet
+from auth_service.auth.utils import decode_jwt
+
+
+USER = UserGet(id=uuid.uuid4(), username="alice", email="alice@example.com", is_active=True)
+
+
+@pytest.fixture(params=["memory", "database"])
+def run_with_store(
+    request: pytest.FixtureRequest,
+    run_with_users: Callable[..., Any],
+) -> Callable[[Callable[[RefreshTokenStore], Awaitable[Any]]], Any]:
+    def run(test: Callable[[RefreshTokenStore], Awaitable[Any]]) -> Any:
+        async def with_store(session_maker: async_sessionmaker[AsyncSession]) -> Any:
+            if request.param == "memory":
+                return await test(InMemoryRefreshTokenStore())
+            async with session_maker() as session:
+                return await test(DatabaseRefreshTokenStore(session))
+
+        return run_with_users([], with_store)
+
+    return run
+
+
+async def issue(store: RefreshTokenStore, family_id: uuid.UUID | None = None) -> uuid.UUID:
+    return uuid.UUID(decode_jwt(await issue_refresh_token(store, USER, family_id))["jti"])
+
+
+def make_record(expires_in: datetime.timedelta) -> RefreshTokenRecord:
+    jti = uuid.uuid4()
+    return RefreshTokenRecord(
+        jti=jti,
+        user_id=USER.id,
+        family_id=jti,
+        expires_at=datetime.datetime.now(datetime.UTC) + expires_in,
+    )
+
+
+def test_rotation_consumes_the_token(run_with_store: Callable[..., Any]) -> None:
+    async def test(store: RefreshTokenStore) -> None:
+        jti = await issue(store)
+
+        record = await rotate_refresh_token(store, jti)
+        assert (record.jti, record.user_id, record.family_id) == (jti, USER.id, jti)
+
+        rotated_jti = await issue(store, family_id=record.family_id)
+        assert (await rotate_refresh_token(store, rotated_jti)).family_id == jti
+
+    run_with_store(test)
+
+
+def test_reuse_revokes_the_whole_family(run_with_store: Callable[..., Any]) -> None:
+    async def test(store: RefreshTokenStore) -> None:
+        jti = await issue(store)
+        other_family_jti = await issue(store)
+        record = await rotate_refresh_token(store, jti)
+        rotated_jti = await issue(store, family_id=record.family_id)
+
+        with pytest.raises(RefreshTokenReused):
+            await rotate_refresh_token(store, jti)
+        # The token rotated from the leaked one is revoked with it
+        with pytest.raises(InvalidRefreshToken):
+            await rotate_refresh_token(store, rotated_jti)
+        assert (await store.get(rotated_jti)).revoked  # type: ignore
+
+        # Other logins of the user are not affected
+        assert (await rotate_refresh_token(store, other_family_jti)).jti == other_family_jti
+
+    run_with_store(test)
+
+
+def test_unknown_and_expired_tokens_are_invalid(run_with_store: Callable[..., Any]) -> None:
+    async def test(store: RefreshTokenStore) -> None:
+        expired = make_record(-datetime.timedelta(seconds=1))
+        await store.add(expired)
+
+        for jti in (uuid.uuid4(), expired.jti):
+            with pytest.raises(InvalidRefreshToken) as exc_info:
+                await rotate_refresh_token(store, jti)
+            assert not isinstance(exc_info.value, RefreshTokenReused)
+
+    run_with_store(test)
+
+
+def test_revoking_a_user_invalidates_every_family(run_with_store: Callable[..., Any]) -> None:
+    async def test(store: RefreshTokenStore) -> None:
+        jtis = [await issue(store), await issue(store)]
+
+        await store.revoke_user(USER.id)
+
+        for jti in jtis:
+            with pytest.raises(InvalidRefreshToken):
+                await rotate_refresh_token(store, jti)
+
+    run_with_store(test)
+
+
+def test_purge_deletes_only_expired_tokens_in_batches(run_with_store: Callable[..., Any]) -> None:
+    async def test(store: RefreshTokenStore) -> None:
+        expired = [make_record(-datetime.timedelta(minutes=1)) for _ in range(3)]
+        valid = make_record(datetime.timedelta(minutes=1))
+        for record in (*expired, valid):
+            await store.add(record)
+
+        assert await store.purge_expired(batch_size=2) == 2
+        assert await store.purge_expired(batch_size=2) == 1
+        assert await store.purge_expired(batch_size=2) == 0
+
+        assert [await store.get(record.jti) for record in expired] == [None] * 3
+        assert await store.get(valid.jti) is not None
+
+    run_with_store(test)
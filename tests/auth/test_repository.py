@@ -0,0 +1,78 @@
+import asyncio
+from typing import Any, Callable
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from auth_service.auth.exceptions import InvalidSortOrder
+from auth_service.auth.repository import StatementCatalog, UserRepository
+
+
+def test_catalog_reuses_statements_per_shape() -> None:
+    catalog = StatementCatalog()
+
+    statement = catalog.lookup("id", ("username",))
+
+    assert catalog.lookup("id", ("username",)) is statement
+    assert catalog.lookup("id", ("email",)) is not statement
+    assert catalog.lookup("username", ("username",)) is not statement
+    assert catalog.stats() == {"statements": 3, "hits": 1, "misses": 3}
+
+
+def test_catalog_statements_bind_values_at_execution(run_with_users: Callable[..., Any]) -> None:
+    catalog = StatementCatalog()
+
+    async def test(session_maker: async_sessionmaker[AsyncSession]) -> None:
+        async with session_maker() as session:
+            for username in ("alice", "bob"):
+                result = await session.execute(catalog.lookup("username", ("email",)), {"value": username})
+                assert result.scalar_one() == f"{username}@example.com"
+
+            result = await session.execute(catalog.lookup_many("username", ("username",)), {"values": ["alice", "bob"]})
+            assert sorted(result.scalars()) == ["alice", "bob"]
+
+            result = await session.execute(catalog.page("username", ("username",)), {"offset": 1, "limit": 1})
+            assert result.scalars().all() == ["bob"]
+
+    run_with_users(["alice", "bob"], test)
+    assert catalog.stats()["statements"] == 3
+
+
+def test_stream_yields_chunks_in_order(run_with_users: Callable[..., Any]) -> None:
+    async def test(session_maker: async_sessionmaker[AsyncSession]) -> list[list[str]]:
+        async with session_maker() as session:
+            repository = UserRepository(session)
+            return [
+                [row.username for row in rows]
+                async for rows in repository.stream_multiple(("username",), order="username", chunk_size=2)
+            ]
+
+    assert run_with_users(["carol", "alice", "bob"], test) == [["alice", "bob"], ["carol"]]
+
+
+def test_projected_lookup_returns_only_the_columns(run_with_users: Callable[..., Any]) -> None:
+    async def test(session_maker: async_sessionmaker[AsyncSession]) -> Any:
+        async with session_maker() as session:
+            return await UserRepository(session).get_single(columns=("id", "email"), username="alice")
+
+    user = run_with_users(["alice"], test)
+
+    assert user._fields == ("id", "email")
+    assert user.email == "alice@example.com"
+
+
+@pytest.mark.parametrize("order", ["hashed_password", "is_admin", "id; DROP TABLE users"])
+def test_listing_rejects_unknown_sort_columns(order: str) -> None:
+    # The order is checked before the session is used
+    repository = UserRepository(None)  # type: ignore
+
+    with pytest.raises(InvalidSortOrder):
+        asyncio.run(repository.get_multiple(order=order))
+    with pytest.raises(InvalidSortOrder):
+        asyncio.run(repository.get_multiple_after(order=order))
+
+    async def stream() -> None:
+        async for _ in repository.stream_multiple(("id",), order=order):
+            pass
+
+    with pytest.raises(InvalidSortOrder):
+        asyncio.run(stream())
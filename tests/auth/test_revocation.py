@@ -0,0 +1,123 @@
+import datetime
+import time
+import uuid
+from typing import Any, Callable
+import httpx
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from auth_service.auth.models import TokenRevocation
+from auth_service.auth.revocation import RevocationList, RevocationSync, TokenRevoker
+from tests.auth.conftest import bearer, sign_up
+
+
+def test_revoked_token_ids_are_rejected() -> None:
+    revocations = RevocationList()
+    jti = uuid.uuid4()
+
+    revocations.add(expires_at=time.time() + 60, jti=jti)
+
+    assert revocations.is_revoked({"jti": str(jti), "sub": "alice"})
+    assert not revocations.is_revoked({"jti": str(uuid.uuid4()), "sub": "alice"})
+
+
+def test_user_revocation_rejects_only_older_token_versions() -> None:
+    revocations = RevocationList()
+    user_id = str(uuid.uuid4())
+
+    revocations.add(expires_at=time.time() + 60, user_id=user_id, min_token_version=2)
+    # A later revocation with a lower version does not lower the minimum
+    revocations.add(expires_at=time.time() + 60, user_id=user_id, min_token_version=1)
+
+    assert revocations.is_revoked({"sub": user_id, "ver": 1})
+    assert revocations.is_revoked({"sub": user_id})
+    assert not revocations.is_revoked({"sub": user_id, "ver": 2})
+    assert not revocations.is_revoked({"sub": str(uuid.uuid4()), "ver": 0})
+
+
+def test_prune_drops_expired_revocations() -> None:
+    revocations = RevocationList()
+    revocations.add(expires_at=time.time() - 1, jti=uuid.uuid4())
+    revocations.add(expires_at=time.time() - 1, user_id=uuid.uuid4(), min_token_version=1)
+    revocations.add(expires_at=time.time() + 60, jti=uuid.uuid4())
+
+    revocations.prune()
+
+    assert len(revocations) == 1
+
+
+def test_revocations_reach_other_workers_through_the_log(run_with_users: Callable[..., Any]) -> None:
+    jti, expired_jti, user_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+
+    async def test(session_maker: async_sessionmaker[AsyncSession]) -> tuple[RevocationList, RevocationList, int]:
+        worker, other_worker = RevocationList(), RevocationList()
+        sync = RevocationSync(other_worker, session_maker, interval=1.0, overlap=5.0, purge_interval=60.0)
+        async with session_maker() as session:
+            revoker = TokenRevoker(session, worker)
+            await revoker.revoke_token(jti, datetime.datetime.now(datetime.UTC) + datetime.timedelta(minutes=1))
+            await revoker.revoke_token(expired_jti, datetime.datetime.now(datetime.UTC) - datetime.timedelta(minutes=1))
+            await revoker.revoke_user(user_id, min_token_version=3)
+
+        assert await sync.sync() == 2
+        # Rows within the overlap are read again, which is harmless
+        assert await sync.sync() == 2
+
+        await sync.purge_expired()
+        async with session_maker() as session:
+            remaining = (await session.execute(select(func.count()).select_from(TokenRevocation))).scalar_one()
+        return worker, other_worker, remaining
+
+    worker, other_worker, remaining = run_with_users([], test)
+
+    for revocations in (worker, other_worker):
+        assert revocations.is_revoked({"jti": str(jti)})
+        assert revocations.is_revoked({"sub": str(user_id), "ver": 2})
+    assert not other_worker.is_revoked({"jti": str(expired_jti)})
+    assert remaining == 2
+
+
+def test_logout_everywhere_revokes_access_and_refresh_tokens(run_with_app: Callable[..., Any]) -> None:
+    async def test(client: httpx.AsyncClient, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        tokens = await sign_up(client, "alice")
+        other_login = (await client.post("/auth/login", data={"username": "alice", "password": "password"})).json()
+        assert (await client.get("/users/me", headers=bearer(tokens["access_token"]))).status_code == 200
+
+        response = await client.post("/auth/logout-all", headers=bearer(tokens["access_token"]))
+        assert response.status_code == 204
+
+        for access_token in (tokens["access_token"], other_login["access_token"]):
+            assert (await client.get("/users/me", headers=bearer(access_token))).status_code == 403
+        response = await client.post("/auth/refresh", headers=bearer(other_login["refresh_token"]))
+        assert response.status_code == 401
+
+        # Logging in again gives tokens of the new version
+        tokens = (await client.post("/auth/login", data={"username": "alice", "password": "password"})).json()
+        assert (await client.get("/users/me", headers=bearer(tokens["access_token"]))).status_code == 200
+
+    run_with_app([], test)
+
+
+def test_logout_revokes_only_the_token_used(run_with_app: Callable[..., Any]) -> None:
+    async def test(client: httpx.AsyncClient, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        tokens = await sign_up(client, "alice")
+        other_login = (await client.post("/auth/login", data={"username": "alice", "password": "password"})).json()
+
+        assert (await client.post("/auth/logout", headers=bearer(tokens["access_token"]))).status_code == 204
+
+        assert (await client.get("/users/me", headers=bearer(tokens["access_token"]))).status_code == 403
+        assert (await client.get("/users/me", headers=bearer(other_login["access_token"]))).status_code == 200
+
+    run_with_app([], test)
+
+
+def test_deleting_a_user_revokes_the_user_tokens(run_with_app: Callable[..., Any]) -> None:
+    async def test(client: httpx.AsyncClient, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        tokens = await sign_up(client, "alice")
+
+        assert (await client.delete("/users/", headers=bearer(tokens["access_token"]))).status_code == 200
+
+        assert (await client.get("/users/me", headers=bearer(tokens["access_token"]))).status_code == 403
+        response = await client.post("/auth/refresh", headers=bearer(tokens["refresh_token"]))
+        assert response.status_code == 401
+
+    run_with_app([], test)
@@ -0,0 +1,87 @@
+import asyncio
+from typing import Any, Callable
+import pytest
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from auth_service.auth.config import auth_settings
+from auth_service.main import app
+from tests.auth.conftest import bearer, sign_up
+
+
+def get(path: str, **kwargs) -> httpx.Response:  # type: ignore
+    async def main() -> httpx.Response:
+        transport = httpx.ASGITransport(app=app)  # type: ignore
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, **kwargs)
+
+    return asyncio.run(main())
+
+
+def get_as_user(run_with_app: Callable[..., Any], path: str, **kwargs: Any) -> httpx.Response:
+    async def test(client: httpx.AsyncClient, session_maker: async_sessionmaker[AsyncSession]) -> httpx.Response:
+        tokens = await sign_up(client, "alice")
+        return await client.get(path, headers=bearer(tokens["access_token"]), **kwargs)
+
+    return run_with_app([], test)  # type: ignore
+
+
+@pytest.mark.parametrize("order", ["hashed_password", "is_admin", "nope"])
+def test_listing_with_unknown_sort_order_is_rejected(run_with_app: Callable[..., Any], order: str) -> None:
+    response = get_as_user(run_with_app, "/users/", params={"order": order})
+
+    assert response.status_code == 422
+    assert response.json() == {"detail": "Invalid value of order"}
+
+
+def test_listing_with_invalid_cursor_is_rejected(run_with_app: Callable[..., Any]) -> None:
+    response = get_as_user(run_with_app, "/users/", params={"cursor": "not a cursor"})
+
+    assert response.status_code == 422
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+def test_listing_limit_is_capped(run_with_app: Callable[..., Any]) -> None:
+    response = get_as_user(run_with_app, "/users/", params={"limit": auth_settings.user_listing_max_limit + 1})
+
+    assert response.status_code == 422
+
+
+def test_listing_needs_authentication() -> None:
+    assert get("/users/").status_code == 403
+
+
+def test_lookup_is_open_to_authenticated_users(run_with_app: Callable[..., Any]) -> None:
+    async def test(client: httpx.AsyncClient, session_maker: async_sessionmaker[AsyncSession]) -> list[httpx.Response]:
+        tokens = await sign_up(client, "alice")
+        usernames = {"usernames": ["alice", "bob"]}
+        too_many = {"usernames": [f"user{number}" for number in range(auth_settings.user_lookup_max_values + 1)]}
+        return [
+            await client.post("/users/lookup", json=usernames),
+            await client.post("/users/lookup", json=usernames, headers=bearer(tokens["access_token"])),
+            await client.post("/users/lookup", json=too_many, headers=bearer(tokens["access_token"])),
+        ]
+
+    unauthenticated, response, too_many = run_with_app([], test)
+
+    assert unauthenticated.status_code == 403
+    assert response.status_code == 200
+    assert response.json()["alice"]["username"] == "alice"
+    assert response.json()["bob"] is None
+    assert too_many.status_code == 422
+
+
+@pytest.mark.parametrize("if_none_match", ["{etag}", "W/{etag}", '"other", {etag}', "*"])
+def test_jwks_is_not_sent_again_if_unchanged(if_none_match: str) -> None:
+    etag = get("/.well-known/jwks.json").headers["ETag"]
+
+    response = get("/.well-known/jwks.json", headers={"If-None-Match": if_none_match.format(etag=etag)})
+
+    assert response.status_code == 304
+
+
+def test_jwks_is_sent_if_changed() -> None:
+    response = get("/.well-known/jwks.json", headers={"If-None-Match": '"other"'})
+
+    assert response.status_code == 200
+    assert response.json()["keys"]
@@ -0,0 +1,108 @@
+import os
+import time
+import uuid
+from pathlib import Path
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from jwt.exceptions import InvalidTokenError
+
+from auth_service.auth import token_cache as token_cache_module, utils
+from auth_service.auth.codec import TokenCodec
+from auth_service.auth.keys import KeyManager
+from auth_service.auth.scemas import UserGetWithVersion
+from auth_service.auth.token_cache import TokenCache, decode_jwt_cached, token_cache
+from auth_service.auth.utils import create_access_token, create_refresh_token
+
+
+def make_user() -> UserGetWithVersion:
+    return UserGetWithVersion(id=uuid.uuid4(), username="alice", email="alice@example.com", is_active=True)
+
+
+def test_entries_expire_at_the_exp_claim(monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = TokenCache()
+    now = time.time()
+    cache.set("token", {"sub": "alice", "exp": now + 60})
+
+    assert cache.get("token") == {"sub": "alice", "exp": now + 60}
+
+    monkeypatch.setattr(time, "time", lambda: now + 60)
+
+    assert cache.get("token") is None
+    assert cache.stats() == {"entries": 0, "size_bytes": 0, "hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_tokens_without_exp_are_not_cached() -> None:
+    cache = TokenCache()
+    cache.set("token", {"sub": "alice"})
+
+    assert cache.get("token") is None
+    assert len(cache) == 0
+
+
+def test_size_is_capped_by_evicting_the_least_recently_used() -> None:
+    exp = time.time() + 60
+    size = TokenCache._payload_size(TokenCache._key("token0"), {"sub": "alice", "exp": exp})
+    cache = TokenCache(max_bytes=2 * size)
+
+    for number in range(3):
+        cache.set(f"token{number}", {"sub": "alice", "exp": exp})
+
+    assert cache.get("token0") is None
+    assert cache.get("token1") is not None
+    assert cache.get("token2") is not None
+    assert cache.stats()["size_bytes"] == 2 * size
+    assert cache.stats()["evictions"] == 1
+
+
+def test_payloads_larger_than_the_cap_are_not_cached() -> None:
+    cache = TokenCache(max_bytes=1024)
+    cache.set("token", {"sub": "a" * 2048, "exp": time.time() + 60})
+
+    assert len(cache) == 0
+    assert cache.size_bytes == 0
+
+
+def test_only_access_tokens_are_cached() -> None:
+    token_cache.clear()
+    user = make_user()
+    access_token = create_access_token(user)
+    refresh_token = create_refresh_token(user, uuid.uuid4())
+
+    assert decode_jwt_cached(refresh_token)["type"] == "refresh"
+    assert len(token_cache) == 0
+
+    assert decode_jwt_cached(access_token)["sub"] == str(user.id)
+    assert decode_jwt_cached(access_token)["sub"] == str(user.id)
+    assert len(token_cache) == 1
+
+
+def write_key(keys_dir: Path, kid: str, mtime: float) -> Path:
+    path = keys_dir / f"{kid}.private.pem"
+    path.write_bytes(
+        ec.generate_private_key(ec.SECP256R1()).private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_cached_tokens_of_a_removed_key_are_rejected(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    retired_key_path = write_key(tmp_path, "retired", mtime=1_000_000)
+    keys = KeyManager(keys_dir=tmp_path, signing_kid=None, reload_interval=0.0)
+    codec = TokenCodec(keys)
+    monkeypatch.setattr(utils, "token_codec", codec)
+    monkeypatch.setattr(token_cache_module, "token_codec", codec)
+    monkeypatch.setattr(token_cache_module, "key_manager", keys)
+    monkeypatch.setattr(token_cache_module, "token_cache", TokenCache())
+    token = create_access_token(make_user())
+    assert decode_jwt_cached(token)["type"] == "access"
+
+    write_key(tmp_path, "current", mtime=2_000_000)
+    retired_key_path.unlink()
+
+    with pytest.raises(InvalidTokenError):
+        decode_jwt_cached(token)
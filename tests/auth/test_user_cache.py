@@ -0,0 +1,134 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Callable
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from auth_service.cache import InMemoryCacheBackend
+from auth_service.auth.models import User
+from auth_service.auth.repository import UserRepository
+from auth_service.auth.user_cache import CachedUserRepository, UserCache
+
+
+def make_user(username: str = "alice", email: str | None = None) -> User:
+    return User(
+        id=uuid.uuid4(),
+        username=username,
+        email=email or f"{username}@example.com",
+        is_active=True,
+        token_version=0,
+    )
+
+
+def test_users_are_found_by_id_username_and_email() -> None:
+    async def main() -> None:
+        cache = UserCache()
+        user = make_user()
+        await cache.set(user)
+
+        for field in ("id", "username", "email"):
+            record = await cache.get(field, getattr(user, field))
+            assert record is not None and record["id"] == str(user.id)
+        assert await cache.get("username", "bob") is None
+
+    asyncio.run(main())
+
+
+def test_stale_pointers_are_misses() -> None:
+    async def main() -> None:
+        cache = UserCache(fill_guard=0.0)
+        user = make_user()
+        await cache.set(user)
+        await cache.invalidate(user.id)
+        # The renamed user, while the old username still points to the user's id
+        renamed_user = make_user("bob", email=user.email)
+        renamed_user.id = user.id
+        await cache.set(renamed_user)
+
+        assert await cache.get("username", "alice") is None
+        assert await cache.get("username", "bob") is not None
+
+    asyncio.run(main())
+
+
+def test_fills_are_skipped_while_invalidated(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+
+    async def main() -> UserCache:
+        cache = UserCache(fill_guard=5.0)
+        user = make_user()
+        await cache.set(user)
+        await cache.invalidate(user.id)
+
+        assert await cache.get("id", user.id) is None
+        # A fill with the row read before the update
+        await cache.set(user)
+        assert await cache.get("id", user.id) is None
+
+        monkeypatch.setattr(time, "monotonic", lambda: now + 5.0)
+        await cache.set(user)
+        assert await cache.get("id", user.id) is not None
+        return cache
+
+    assert asyncio.run(main()).stats()["skipped_fills"] == 1
+
+
+def test_invalidation_reaches_other_workers_through_the_backend() -> None:
+    async def main() -> tuple[UserCache, UserCache]:
+        backend = InMemoryCacheBackend()
+        worker, other_worker = UserCache(backend=backend), UserCache(backend=backend)
+        user = make_user()
+        await worker.set(user)
+        assert await other_worker.get("username", "alice") is not None
+
+        await worker.invalidate(user.id)
+        other_worker.local.clear()
+        assert await other_worker.get("username", "alice") is None
+
+        await other_worker.set(user)
+        return worker, other_worker
+
+    _, other_worker = asyncio.run(main())
+
+    assert other_worker.stats()["skipped_fills"] == 1
+
+
+def test_repository_serves_cached_columns_and_invalidates_on_update(run_with_users: Callable[..., Any]) -> None:
+    cache = UserCache(fill_guard=0.0)
+
+    async def test(session_maker: async_sessionmaker[AsyncSession]) -> None:
+        async with session_maker() as session:
+            repository = CachedUserRepository(session, cache)
+            user = await repository.get_single(columns=("id", "email"), username="alice")
+            assert user is not None and user.email == "alice@example.com"
+            assert (await repository.get_single(columns=("email",), username="alice")).email == "alice@example.com"
+            assert cache.stats()["hits"] == 1
+
+            # Credentials are never cached
+            user = await repository.get_single(columns=("hashed_password",), username="alice")
+            assert user.hashed_password == "hash"
+            assert cache.stats()["hits"] + cache.stats()["misses"] == 2
+
+            await repository.update(data={"email": "alice@example.org"}, username="alice")
+            assert (await repository.get_single(columns=("email",), username="alice")).email == "alice@example.org"
+
+    run_with_users(["alice"], test)
+
+
+@pytest.mark.parametrize("replica", [True, False])
+def test_misses_are_filled_from_where_the_lookup_reads(monkeypatch: pytest.MonkeyPatch, replica: bool) -> None:
+    calls: list[tuple[tuple[str, ...], bool]] = []
+    user = make_user()
+
+    async def get_single(self: UserRepository, columns: Any = None, replica: bool = True, **filters: Any) -> User:
+        calls.append((tuple(columns), replica))
+        return user
+
+    monkeypatch.setattr(UserRepository, "get_single", get_single)
+    repository = CachedUserRepository(None, UserCache())  # type: ignore
+
+    asyncio.run(repository.get_single(columns=("email",), replica=replica, username="alice"))
+
+    assert calls == [(("id", "username", "email", "is_active", "token_version"), replica)]
@@ -0,0 +1,35 @@
+import os
+import tempfile
+from pathlib import Path
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+def _configure_environment(directory: Path) -> None:
+    # Settings are read at import time; the database they point to is never connected to
+    for name, value in {"DB_HOST": "localhost", "DB_PORT": "5432", "DB_NAME": "auth", "DB_USER": "auth"}.items():
+        os.environ.setdefault(name, value)
+    # The lowest bcrypt cost, so that creating users and logging in stay fast
+    os.environ.setdefault("PASSWORD_HASH_BCRYPT_ROUNDS", "4")
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_key_path = directory / "private.pem"
+    public_key_path = directory / "public.pem"
+    private_key_path.write_bytes(
+        private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    public_key_path.write_bytes(
+        private_key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+    )
+    os.environ.setdefault("PRIVATE_KEY_PATH", str(private_key_path))
+    os.environ.setdefault("PUBLIC_KEY_PATH", str(public_key_path))
+
+
+_configure_environment(Path(tempfile.mkdtemp(prefix="auth-service-tests-")))
@@ -0,0 +1,40 @@
+import asyncio
+
+from auth_service.database import ReplicaRouter
+
+
+def make_router(lags: list[float | None], max_lag_seconds: float = 5.0) -> ReplicaRouter:
+    router = ReplicaRouter([f"sqlite+aiosqlite:///replica{number}.db" for number in range(len(lags))], max_lag_seconds)
+    lags_by_engine = dict(zip(router.engines, lags))
+
+    async def check_lag(engine):  # type: ignore
+        return lags_by_engine[engine]
+
+    router._check_lag = check_lag  # type: ignore
+    asyncio.run(router.check())
+    return router
+
+
+def test_choose_without_replicas_falls_back_to_the_primary() -> None:
+    router = ReplicaRouter([], max_lag_seconds=5.0)
+
+    assert router.choose() is None
+    assert router.stats()["fallback_reads"] == 1
+
+
+def test_choose_spreads_reads_over_replicas_that_keep_up() -> None:
+    router = make_router([0.0, 30.0, None, 1.0])
+
+    chosen = [router.choose() for _ in range(4)]
+
+    assert chosen == [router.engines[0], router.engines[3], router.engines[0], router.engines[3]]
+    assert router.stats()["available"] == 2
+    assert router.stats()["replica_reads"] == 4
+
+
+def test_choose_falls_back_when_every_replica_lags() -> None:
+    router = make_router([30.0, None])
+
+    assert router.choose() is None
+    assert router.stats()["lag_max_seconds"] == 30.0
+    assert router.stats()["fallback_reads"] == 1
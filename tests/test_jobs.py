@@ -0,0 +1,149 @@
+import asyncio
+from pathlib import Path
+from typing import Any, Callable
+import pytest
+
+from auth_service.jobs import InMemoryJobStore, Job, JobQueue, JobStore, SQLiteJobStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request: pytest.FixtureRequest, tmp_path: Path) -> Callable[[], JobStore]:
+    if request.param == "sqlite":
+        return lambda: SQLiteJobStore(str(tmp_path / "jobs.db"))
+    return InMemoryJobStore
+
+
+def make_queue(make_store: Callable[[], JobStore], **kwargs: Any) -> JobQueue:
+    options: dict[str, Any] = {
+        "concurrency": 1,
+        "batch_size": 10,
+        "batch_window": 0.01,
+        "poll_interval": 0.01,
+        "max_attempts": 3,
+        "retry_base_seconds": 0.01,
+        "lease_seconds": 30.0,
+    }
+    return JobQueue(make_store, **(options | kwargs))
+
+
+def test_store_replaces_pending_jobs_with_the_same_key(make_store: Callable[[], JobStore]) -> None:
+    async def main() -> None:
+        store = make_store()
+        assert await store.add([Job("purge", {"number": 1}, key="all")]) == 0
+        assert await store.add([Job("purge", {"number": 2}, key="all"), Job("purge", {"number": 3})]) == 1
+
+        jobs = await store.take("purge", 10, lease_seconds=30.0)
+        assert sorted(job.payload["number"] for job in jobs) == [2, 3]
+
+        # Leased jobs may be running, so they are kept
+        assert await store.add([Job("purge", {"number": 4}, key="all")]) == 0
+        assert await store.count() == 3
+
+    asyncio.run(main())
+
+
+def test_failed_batches_are_retried(make_store: Callable[[], JobStore]) -> None:
+    calls: list[list[dict[str, Any]]] = []
+
+    async def handler(payloads: list[dict[str, Any]]) -> None:
+        calls.append(payloads)
+        if len(calls) < 3:
+            raise RuntimeError("Temporary failure")
+
+    async def main() -> dict[str, int]:
+        queue = make_queue(make_store)
+        queue.register("send", handler)
+        queue.start()
+        queue.enqueue("send", {"number": 1})
+        while queue.completed < 1:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return queue.stats()
+
+    stats = asyncio.run(main())
+
+    assert calls == [[{"number": 1}]] * 3
+    assert stats["failed"] == 2
+    assert stats["completed"] == 1
+
+
+def test_jobs_are_dropped_after_max_attempts(make_store: Callable[[], JobStore]) -> None:
+    async def handler(payloads: list[dict[str, Any]]) -> None:
+        raise RuntimeError("Permanent failure")
+
+    async def main() -> tuple[dict[str, int], int]:
+        queue = make_queue(make_store, max_attempts=2)
+        queue.register("send", handler)
+        queue.start()
+        queue.enqueue("send", {})
+        while queue.dropped < 1:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return queue.stats(), await queue.store.count()  # type: ignore
+
+    stats, pending = asyncio.run(main())
+
+    assert stats["failed"] == 1
+    assert stats["dropped"] == 1
+    assert pending == 0
+
+
+def test_jobs_with_the_same_key_are_merged(make_store: Callable[[], JobStore]) -> None:
+    calls: list[list[dict[str, Any]]] = []
+
+    async def handler(payloads: list[dict[str, Any]]) -> None:
+        calls.append(payloads)
+
+    async def main() -> dict[str, int]:
+        queue = make_queue(make_store)
+        queue.register("rehash", handler)
+        queue.start()
+        for number in range(3):
+            queue.enqueue("rehash", {"number": number}, key="user")
+        queue.enqueue("rehash", {"number": 3}, key="other user")
+        while queue.completed < 2:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return queue.stats()
+
+    stats = asyncio.run(main())
+
+    assert calls == [[{"number": 2}, {"number": 3}]]
+    assert stats["coalesced"] == 2
+
+
+def test_stop_finishes_in_memory_jobs_waiting_for_a_retry() -> None:
+    calls = 0
+
+    async def handler(payloads: list[dict[str, Any]]) -> None:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("Temporary failure")
+
+    async def main() -> dict[str, int]:
+        queue = make_queue(InMemoryJobStore, retry_base_seconds=0.2)
+        queue.register("rehash", handler)
+        queue.start()
+        queue.enqueue("rehash", {}, durable=False)
+        while queue.failed < 1:
+            await asyncio.sleep(0.01)
+        await queue.stop(timeout=5.0)
+        return queue.stats()
+
+    stats = asyncio.run(main())
+
+    assert calls == 2
+    assert stats["completed"] == 1
+
+
+def test_store_is_created_on_start() -> None:
+    queue = make_queue(InMemoryJobStore)
+    assert queue.store is None
+
+    async def main() -> None:
+        queue.start()
+        await queue.stop()
+
+    asyncio.run(main())
+    assert isinstance(queue.store, InMemoryJobStore)